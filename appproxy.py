@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AppProxy:
+    # TCP reverse proxy that gives every exposed app a stable front port.
+    # Connections are piped to the app's current backend port; if the app is
+    # not running, the connection is held while ensure_running(name) cold
+    # starts it; it returns (port or None, whether it launched the app), and
+    # concurrent connections share one call. Apps with no open connections and no traffic for their idle
+    # timeout are stopped through stop(name) and woken again on demand.
+    # Works at the TCP level, so HTTP keep-alive, SSE and websockets pass
+    # through untouched; "activity" is connections and bytes.
+    def __init__(self, ensure_running, current_port, stop, host="127.0.0.1",
+                 idle_timeout=0.0, reap_interval=5.0, buffer_size=64 * 1024, launch_workers=4):
+        self.ensure_running = ensure_running
+        self.current_port = current_port
+        self.stop = stop
+        self.host = host
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self.buffer_size = buffer_size
+        self._apps = {}
+        self._lock = threading.Lock()
+        # Launches and stops block; they get their own threads rather than
+        # the loop's default executor
+        self._executor = ThreadPoolExecutor(max_workers=launch_workers, thread_name_prefix="app-proxy-launch")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="app-proxy", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._reaper(), self._loop)
+
+    def expose(self, name, front_port, idle_timeout=None):
+        # Starts listening on front_port for `name`; idempotent
+        with self._lock:
+            if name in self._apps:
+                return self._apps[name]["front_port"]
+            entry = self._apps[name] = {
+                "front_port": front_port,
+                "idle_timeout": self.idle_timeout if idle_timeout is None else idle_timeout,
+                "connections": 0,
+                "total_connections": 0,
+                "bytes": 0,
+                "last_activity": time.monotonic(),
+                "cold_starts": 0,
+                "launch": None,
+                "server": None
+            }
+        future = asyncio.run_coroutine_threadsafe(self._listen(name, entry), self._loop)
+        try:
+            future.result(timeout=5)
+        except Exception:
+            with self._lock:
+                self._apps.pop(name, None)
+            raise
+        return front_port
+
+    def unexpose(self, name):
+        with self._lock:
+            entry = self._apps.pop(name, None)
+        if entry and entry["server"]:
+            self._loop.call_soon_threadsafe(entry["server"].close)
+        return entry
+
+    def front_port(self, name):
+        with self._lock:
+            entry = self._apps.get(name)
+            return entry["front_port"] if entry else None
+
+    def stats(self, name=None):
+        now = time.monotonic()
+        with self._lock:
+            result = {
+                key: {
+                    "front_port": e["front_port"],
+                    "connections": e["connections"],
+                    "total_connections": e["total_connections"],
+                    "bytes": e["bytes"],
+                    "idle_seconds": round(now - e["last_activity"], 1),
+                    "idle_timeout": e["idle_timeout"],
+                    "cold_starts": e["cold_starts"]
+                } for key, e in self._apps.items()
+            }
+        return result.get(name) if name is not None else result
+
+    async def _listen(self, name, entry):
+        entry["server"] = await asyncio.start_server(
+            lambda r, w: self._handle(name, entry, r, w), self.host, entry["front_port"]
+        )
+
+    async def _handle(self, name, entry, client_reader, client_writer):
+        entry["connections"] += 1
+        entry["total_connections"] += 1
+        entry["last_activity"] = time.monotonic()
+        upstream_writer = None
+        try:
+            port = self.current_port(name)
+            if port is None:
+                # Scaled to zero: hold the connection while the app boots
+                port = await asyncio.shield(self._launch(name, entry))
+                if port is None:
+                    client_writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    await client_writer.drain()
+                    return
+            upstream_reader, upstream_writer = await asyncio.open_connection(self.host, port)
+            await asyncio.gather(
+                self._pipe(entry, client_reader, upstream_writer),
+                self._pipe(entry, upstream_reader, client_writer)
+            )
+        except (OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            entry["connections"] -= 1
+            entry["last_activity"] = time.monotonic()
+            for writer in (client_writer, upstream_writer):
+                if writer is not None:
+                    writer.close()
+
+    def _launch(self, name, entry):
+        # Runs on the loop; connections arriving while the app boots share
+        # one launch, and only a launch that started the app counts as cold
+        if entry["launch"] is None:
+            entry["launch"] = asyncio.ensure_future(self._cold_start(name, entry))
+            entry["launch"].add_done_callback(lambda _: entry.update(launch=None))
+        return entry["launch"]
+
+    async def _cold_start(self, name, entry):
+        port, launched = await self._loop.run_in_executor(self._executor, self.ensure_running, name)
+        if launched:
+            entry["cold_starts"] += 1
+        return port
+
+    async def _pipe(self, entry, reader, writer):
+        try:
+            while True:
+                data = await reader.read(self.buffer_size)
+                if not data:
+                    break
+                entry["bytes"] += len(data)
+                entry["last_activity"] = time.monotonic()
+                writer.write(data)
+                await writer.drain()
+        finally:
+            if writer.can_write_eof():
+                try:
+                    writer.write_eof()
+                except OSError:
+                    pass
+
+    async def _reaper(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            now = time.monotonic()
+            with self._lock:
+                idle = [
+                    name for name, e in self._apps.items()
+                    if e["idle_timeout"] > 0 and e["connections"] == 0
+                    and now - e["last_activity"] >= e["idle_timeout"]
+                ]
+            for name in idle:
+                if self.current_port(name) is not None:
+                    print(f"[Supervisor] {name} idle, scaling to zero")
+                    await self._loop.run_in_executor(self._executor, self.stop, name)
@@ -0,0 +1,84 @@
+const BACKEND_URL = 'http://localhost:5000';
+
+async function sha256Hex(buffer) {
+  const digest = await crypto.subtle.digest('SHA-256', buffer);
+  return Array.from(new Uint8Array(digest))
+    .map((b) => b.toString(16).padStart(2, '0'))
+    .join('');
+}
+
+async function request(url, options = {}) {
+  const response = await fetch(url, { credentials: 'include', ...options });
+  const data = await response.json().catch(() => ({}));
+  if (!response.ok) {
+    const error = new Error(data.error || data.description || `Request failed (${response.status})`);
+    error.status = response.status;
+    throw error;
+  }
+  return data;
+}
+
+// Resumable, parallel chunked upload. Pass the uploadId from a previous
+// attempt to resume it; only the chunks the server is missing are sent.
+export async function uploadFileResumable(appName, file, {
+  chunkSize = 8 * 1024 * 1024,
+  parallel = 4,
+  retries = 5,
+  uploadId = null,
+  onProgress = () => {},
+  onSession = () => {},
+} = {}) {
+  const base = `${BACKEND_URL}/api/files/${encodeURIComponent(appName)}/uploads`;
+
+  let session = null;
+  if (uploadId) {
+    session = await request(`${base}/${uploadId}`).catch(() => null);
+  }
+  if (!session) {
+    session = await request(base, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        filename: file.name,
+        size: file.size,
+        chunk_size: chunkSize,
+        content_type: file.type || undefined,
+      }),
+    });
+  }
+  onSession(session.upload_id);
+
+  const queue = [...session.missing];
+  let done = session.chunks - queue.length;
+  onProgress(done, session.chunks);
+
+  const sendChunk = async (index) => {
+    const offset = index * session.chunk_size;
+    const blob = file.slice(offset, offset + session.chunk_size);
+    const hash = await sha256Hex(await blob.arrayBuffer());
+    for (let attempt = 0; ; attempt++) {
+      try {
+        await request(`${base}/${session.upload_id}/${index}`, {
+          method: 'PUT',
+          headers: { 'X-Chunk-Offset': String(offset), 'X-Chunk-SHA256': hash },
+          body: blob,
+        });
+        return;
+      } catch (err) {
+        if (attempt >= retries || (err.status && err.status < 500 && err.status !== 422)) throw err;
+        await new Promise((r) => setTimeout(r, Math.min(30000, 500 * 2 ** attempt)));
+      }
+    }
+  };
+
+  const worker = async () => {
+    while (queue.length) {
+      const index = queue.shift();
+      await sendChunk(index);
+      onProgress(++done, session.chunks);
+    }
+  };
+  await Promise.all(Array.from({ length: Math.max(1, parallel) }, worker));
+
+  return request(`${base}/${session.upload_id}/commit`, { method: 'POST' });
+}
@@ -1,17 +1,35 @@
 import os
-import secrets
+import json
+import atexit
+import threading
 import base64
+import secrets
 import hashlib
-import configparser
 import time
 import mimetypes
+from datetime import datetime
+from urllib.parse import quote
 
-from flask import Flask, redirect, url_for, render_template, flash, session, request, jsonify, abort, send_from_directory
+from flask import Flask, redirect, url_for, render_template, flash, session, request, jsonify, abort, send_file, Response, stream_with_context
 from flask_login import LoginManager, login_user, current_user, login_required, logout_user
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-
-from models import db, User
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from models import db, User, StoredFile, Notification, RegistryApp, BusMessage, BusCursor, upgrade_schema
+from cache import TTLCache
+from catalog import AppCatalog
+from icons import IconResolver
+from batching import WriteBuffer
+from eventlog import EventLog
+from messagebus import MessageBus, DatabaseMessageBus
+from storage import BlobStore, ChunkedUploads, UploadError, valid_filename
+from filelock import FileLock
+from settings import SettingsStore, SettingsError, get_path, key_pointer
+from telemetry import Telemetry
+from compress import Compressor
+from fastjson import OrjsonProvider, json_array_stream, orjson
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*"})
@@ -23,94 +41,182 @@ app.secret_key = app.config.get("SECRET_KEY", os.urandom(24))
 
 db.init_app(app)
 
+def set_sqlite_pragmas(dbapi_conn, connection_record):
+    cursor = dbapi_conn.cursor()
+    if app.config["SQLITE_WAL"]:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(app.config['SQLITE_BUSY_TIMEOUT_MS'])}")
+    cursor.close()
+
+# Prometheus metrics at /metrics: per-endpoint counts, latency and size,
+# SQL query counts/time, and lock waits
+telemetry = Telemetry(
+    app, "apollo_backend",
+    profile_dir=app.config["PROFILE_DIR"] or os.path.join(app.instance_path, "profiles"),
+    slow_request_seconds=app.config["PROFILE_SLOW_REQUEST_MS"] / 1000,
+    sample_interval=app.config["PROFILE_SAMPLE_MS"] / 1000
+)
+
+# Registered after telemetry so response size metrics see compressed bodies
+compressor = Compressor(app, codings=app.config["COMPRESS_CODINGS"], min_size=app.config["COMPRESS_MIN_SIZE"])
+if orjson is not None and app.config["JSON_ENCODER"] == "auto":
+    app.json = OrjsonProvider(app)
+
+with app.app_context():
+    if db.engine.dialect.name == "sqlite":
+        event.listen(db.engine, "connect", set_sqlite_pragmas)
+    telemetry.instrument_engine(db.engine)
+
 login_manager = LoginManager()
 login_manager.login_view = "login"
 login_manager.init_app(app)
 
+# Detached User instances keyed by id; merged into the request's session
+# without a SELECT, so @login_required does not hit the DB on every call
+user_cache = TTLCache(maxsize=app.config["USER_CACHE_SIZE"], ttl=app.config["USER_CACHE_TTL"])
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    cached = user_cache.get(user_id)
+    if cached is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        db.session.expunge(user)
+        user_cache.put(user_id, user)
+        cached = user
+    return db.session.merge(cached, load=False)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_cached_user(mapper, connection, target):
+    # Covers password/username changes made anywhere through the ORM
+    user_cache.invalidate(target.id)
+
+def logout_and_forget():
+    if current_user.is_authenticated:
+        user_cache.invalidate(current_user.id)
+    logout_user()
 
 @app.route("/")
 def root():
     return redirect(url_for("api_dashboard"))
 
-@app.route("/api")
-def index():
-    # List only /api routes and their endpoint names, with sample data included
+# The route list only changes when code changes, so it is built once and
+# served as cached bytes. Sample data (the output of every argument-less GET
+# view) is opt-in via ?samples=1 and cached separately for API_SAMPLES_TTL.
+api_index_cache = {"manifest": None, "samples": None, "samples_expires": 0.0}
+api_index_lock = threading.Lock()
+
+def build_route_manifest():
     routes = []
     seen_rules = set()
+    for rule in app.url_map.iter_rules():
+        if not str(rule).startswith("/api/"):
+            continue
+        if str(rule) in seen_rules:
+            continue
+        seen_rules.add(str(rule))
+        routes.append({
+            "endpoint": rule.endpoint,
+            "methods": sorted(rule.methods),
+            "rule": str(rule),
+            "arguments": sorted(rule.arguments)
+        })
+    return routes
+
+
+def collect_route_samples(routes):
+    samples = {}
     with app.test_request_context():
-        for rule in app.url_map.iter_rules():
-            if not str(rule).startswith("/api/"):
-                continue
-            if str(rule) in seen_rules:
+        for route in routes:
+            if "GET" not in route["methods"] or route["arguments"]:
                 continue
-            seen_rules.add(str(rule))
-            route_obj = {
-                "endpoint": rule.endpoint,
-                "methods": list(rule.methods),
-                "rule": str(rule)
-            }
-            # Try to get data for GET routes (except /api itself)
-            if "GET" in route_obj["methods"] and route_obj["rule"] != "/api":
-                try:
-                    view_func = app.view_functions[rule.endpoint]
-                    resp = view_func()
-                    from flask import Response
-                    if isinstance(resp, Response):
-                        route_obj["data"] = resp.get_json()
-                    else:
-                        route_obj["data"] = resp
-                except Exception:
-                    route_obj["data"] = "Error loading data"
-            routes.append(route_obj)
-    return jsonify({"routes": routes})
-
-@app.route("/api/apps")
-def list_apps():
-    base_apps_dir = os.path.join(os.path.dirname(__file__), "../apps")
-    apps = []
+            try:
+                resp = app.view_functions[route["endpoint"]]()
+                if isinstance(resp, Response):
+                    samples[route["rule"]] = resp.get_json() if resp.is_json else None
+                else:
+                    samples[route["rule"]] = resp
+            except Exception:
+                samples[route["rule"]] = "Error loading data"
+    return samples
+
+
+def cached_body(routes):
+    body = json.dumps({"routes": routes}).encode("utf-8")
+    return body, hashlib.sha1(body).hexdigest()
+
+
+def get_api_index(include_samples):
+    with api_index_lock:
+        if api_index_cache["manifest"] is None:
+            api_index_cache["manifest"] = cached_body(build_route_manifest())
+        if not include_samples:
+            return api_index_cache["manifest"]
+
+        now = time.monotonic()
+        if api_index_cache["samples"] is None or now >= api_index_cache["samples_expires"]:
+            routes = build_route_manifest()
+            samples = collect_route_samples(routes)
+            for route in routes:
+                if route["rule"] in samples:
+                    route["data"] = samples[route["rule"]]
+            api_index_cache["samples"] = cached_body(routes)
+            api_index_cache["samples_expires"] = now + app.config["API_SAMPLES_TTL"]
+        return api_index_cache["samples"]
 
-    for source in os.listdir(base_apps_dir):  # Apollo, Additional
-        source_path = os.path.join(base_apps_dir, source)
-        if not os.path.isdir(source_path):
-            continue
 
-        for app_folder in os.listdir(source_path):
-            app_path = os.path.join(source_path, app_folder)
-            if not os.path.isdir(app_path):
-                continue
+@app.route("/api")
+def index():
+    body, etag = get_api_index(request.args.get("samples") in ("1", "true"))
+    if request.if_none_match.contains_weak(etag):
+        resp = app.response_class(status=304)
+    else:
+        resp = app.response_class(body, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+apps_dir = os.path.abspath(app.config.get("APPS_DIR") or os.path.join(os.path.dirname(__file__), "../apps"))
+
+icon_resolver = IconResolver(
+    apps_dir,
+    app.config["ICON_VARIANT_DIR"] or os.path.join(app.instance_path, "icons"),
+    sizes=app.config["ICON_SIZES"],
+    recheck_seconds=app.config["ICON_RECHECK_SECONDS"]
+)
+
+app_catalog = AppCatalog(
+    apps_dir,
+    recheck_seconds=app.config["APP_CATALOG_RECHECK_SECONDS"],
+    icons=icon_resolver
+)
 
-            config_path = os.path.join(app_path, "config.ini")
-            if os.path.isfile(config_path):
-                config = configparser.ConfigParser()
-                config.read(config_path)
-                section = config["App"] if "App" in config else config["DEFAULT"]
-                
-                apps.append({
-                    "name": section.get("name", app_folder),
-                    "description": section.get("description", ""),
-                    "icon": f"/api/icons/{source}/{app_folder}",
-                    "launchUrl": section.get("launchUrl", f"/apps/{source}/{app_folder}/start.py"),
-                    "source": source,
-                    "folder": app_folder
-                })
+@app.route("/api/apps")
+def list_apps():
+    apps, etag = app_catalog.snapshot()
 
-    return jsonify(apps)
+    # Dashboard polls this; let it revalidate instead of re-downloading
+    if request.if_none_match.contains_weak(etag):
+        resp = app.response_class(status=304)
+    else:
+        resp = jsonify(apps)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
 
 @app.route("/api_dashboard")
 def api_dashboard():
     return render_template("api_dashboard.html")
 
-# Storage for settings, notifications, logs, users, apps registry in-memory (demo only)
-# Replace with DB or persistent storage as needed
-app_settings = {}
-app_notifications = []
-app_logs = []
-app_registry = [
-    # Example entries for the registry, you might load this from a remote source or DB
+# Settings and the app registry live in the database, so every worker of a
+# multi-process server sees the same data; users are still a demo dict
+default_registry = [
+    # Seeded into the registry table of a fresh database
     {
         "name": "Apollo Docs",
         "description": "Documentation Viewer and Editor",
@@ -136,12 +242,18 @@ users = {
 
 current_user_id = 1  # Simplified: in real app, use flask-login current_user
 
+# Server workers import this module concurrently; one at a time may create
+# or upgrade tables
+os.makedirs(app.instance_path, exist_ok=True)
+with FileLock(os.path.join(app.instance_path, "schema.lock")), app.app_context():
+    upgrade_schema(default_registry)
+
 
 ### 1. App Registry API ###
 
 @app.route("/api/registry")
 def get_registry():
-    return jsonify(app_registry)
+    return jsonify([entry.to_dict() for entry in RegistryApp.query.order_by(RegistryApp.id)])
 
 
 @app.route("/api/apps/install", methods=["POST"])
@@ -152,37 +264,49 @@ def install_app():
     if not data or "name" not in data or "source" not in data:
         return abort(400, description="Missing required fields")
     
-    # For demo, just append to app_registry if not present
-    exists = any(a for a in app_registry if a["name"] == data["name"])
-    if exists:
+    db.session.add(RegistryApp(
+        name=data["name"],
+        description=data.get("description", ""),
+        icon=data.get("icon", ""),
+        launch_url=data.get("launchUrl", ""),
+        source=data["source"],
+        category=data.get("category", "Uncategorized"),
+        folder=data.get("folder", data["name"].lower().replace(" ", "_"))
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Unique name; also catches two workers installing the same app at once
+        db.session.rollback()
         return jsonify({"message": "App already installed"}), 400
-    
-    app_registry.append({
-        "name": data["name"],
-        "description": data.get("description", ""),
-        "icon": data.get("icon", ""),
-        "launchUrl": data.get("launchUrl", ""),
-        "source": data["source"],
-        "category": data.get("category", "Uncategorized"),
-        "folder": data.get("folder", data["name"].lower().replace(" ", "_"))
-    })
     return jsonify({"message": "App installed successfully"}), 201
 
 
 @app.route("/api/apps/<app_name>", methods=["DELETE"])
 @login_required
 def uninstall_app(app_name):
-    global app_registry
-    before_count = len(app_registry)
-    app_registry = [a for a in app_registry if a["name"] != app_name]
-    if len(app_registry) == before_count:
+    deleted = RegistryApp.query.filter_by(name=app_name).delete()
+    db.session.commit()
+    if not deleted:
         return abort(404, description="App not found")
     return jsonify({"message": "App uninstalled successfully"})
 
 
 ### 2. Plugin Communication API (Simple Message Bus) ###
 
-plugin_messages = {}
+# MESSAGE_BUS=database shares queues between worker processes (serve.py
+# selects it when running more than one worker)
+if app.config["MESSAGE_BUS"] == "database":
+    with app.app_context():
+        message_bus = DatabaseMessageBus(
+            db.engine,
+            BusMessage.__table__,
+            BusCursor.__table__,
+            queue_size=app.config["MESSAGE_QUEUE_SIZE"],
+            poll_interval=app.config["MESSAGE_POLL_INTERVAL"]
+        )
+else:
+    message_bus = MessageBus(queue_size=app.config["MESSAGE_QUEUE_SIZE"])
 
 @app.route("/api/messages/send", methods=["POST"])
 @login_required
@@ -194,37 +318,198 @@ def send_message():
     message = data.get("message")
     if not sender or not receiver or not message:
         return abort(400, description="Missing sender, receiver, or message")
-    
-    plugin_messages.setdefault(receiver, []).append({
-        "from": sender,
-        "message": message,
-        "timestamp": int(time.time())
-    })
-    return jsonify({"message": "Message sent"})
+
+    message_id = message_bus.send(sender, receiver, message)
+    return jsonify({"message": "Message sent", "id": message_id})
 
 
 @app.route("/api/messages/<app_name>")
 @login_required
 def get_messages(app_name):
-    msgs = plugin_messages.get(app_name, [])
-    # Clear messages after fetching for demo purposes
-    plugin_messages[app_name] = []
-    return jsonify(msgs)
+    # ?subscriber= names an independent reader (fan-out), ?wait= long-polls for
+    # up to MESSAGE_MAX_WAIT seconds. Without ?cursor= messages are consumed
+    # as they are returned; with ?cursor= they stay until acked.
+    subscriber = request.args.get("subscriber", "default")
+    cursor = request.args.get("cursor", type=int)
+    wait = min(max(request.args.get("wait", 0, type=float), 0), app.config["MESSAGE_MAX_WAIT"])
+    limit = max(1, min(request.args.get("limit", 100, type=int), app.config["MESSAGE_QUEUE_SIZE"]))
+
+    msgs, new_cursor = message_bus.fetch(app_name, subscriber, cursor=cursor, wait=wait, limit=limit)
+    resp = jsonify(msgs)
+    resp.headers["X-Message-Cursor"] = str(new_cursor)
+    return resp
+
+
+@app.route("/api/messages/<app_name>/ack", methods=["POST"])
+@login_required
+def ack_messages(app_name):
+    data = request.json
+    if not data or not isinstance(data.get("cursor"), int):
+        return abort(400, description="Missing cursor")
+    message_bus.ack(app_name, data.get("subscriber", "default"), data["cursor"])
+    return jsonify({"message": "Acknowledged", "cursor": data["cursor"]})
+
+
+@app.route("/api/messages/<app_name>/stream")
+@login_required
+def stream_messages(app_name):
+    # Server-Sent Events; resumes from Last-Event-ID, ?cursor= or the
+    # subscriber's acked cursor, and acks each message once it is written
+    return sse_response(app_name, request.args.get("subscriber", "default"))
+
+
+def sse_response(receiver, subscriber):
+    cursor = request.headers.get("Last-Event-ID", type=int)
+    if cursor is None:
+        cursor = request.args.get("cursor", type=int)
+    if cursor is None:
+        cursor = message_bus.cursor(receiver, subscriber)
+    heartbeat = app.config["MESSAGE_SSE_HEARTBEAT"]
+
+    def events(cursor):
+        yield "retry: 2000\n\n"
+        while True:
+            msgs, cursor = message_bus.fetch(receiver, subscriber, cursor=cursor, wait=heartbeat)
+            if not msgs:
+                yield ": keep-alive\n\n"
+                continue
+            for msg in msgs:
+                yield f"id: {msg['id']}\ndata: {json.dumps(msg)}\n\n"
+            message_bus.ack(receiver, subscriber, cursor)
+
+    return Response(
+        stream_with_context(events(cursor)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 ### 3. Settings API ###
 
-@app.route("/api/settings/<app_name>", methods=["GET", "POST"])
+# Every settings document has a version; its ETag is "<app>:<version>" and
+# a single key's ETag is a hash of its value. A write with If-Match is
+# rejected with 412 unless it still matches. POST replaces the document,
+# PATCH takes a JSON merge patch (object) or a JSON patch (list), and
+# /api/settings/<app>/<key> reads, sets or deletes one key (a/b/c for
+# nested keys). Writes without If-Match are queued and answered with 202;
+# changes made within SETTINGS_WRITE_DELAY_MS are saved in one transaction.
+settings_store = SettingsStore(
+    app,
+    cache_ttl=app.config["SETTINGS_CACHE_TTL"],
+    write_delay=app.config["SETTINGS_WRITE_DELAY_MS"] / 1000.0
+)
+atexit.register(settings_store.close)
+
+
+@app.errorhandler(SettingsError)
+def handle_settings_error(e):
+    return jsonify({"error": str(e)}), e.status
+
+
+def settings_etag(app_name, version):
+    return f"{quote(app_name, safe='')}:{version}"
+
+
+def setting_key_etag(data, pointer):
+    try:
+        value = get_path(data, pointer)
+    except SettingsError:
+        return None
+    return "k" + hashlib.sha1(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def settings_if_match(current_etag):
+    # current_etag(data, version) -> ETag of the resource as it is now
+    # Called on the settings writer thread, so the header is read here
+    tags = request.if_match
+    if not tags:
+        return None
+
+    def matches(data, version):
+        etag = current_etag(data, version)
+        # Weak comparison: the compressor weakens the ETag the client saw
+        return etag is not None and (tags.star_tag or tags.contains_weak(etag))
+    return matches
+
+
+def settings_saved(result, current_etag):
+    # result is None when the change was queued rather than saved
+    if result is None:
+        return jsonify({"message": "Settings accepted"}), 202
+    data, version = result
+    resp = jsonify({"message": "Settings saved", "version": version})
+    etag = current_etag(data, version)
+    if etag is not None:
+        resp.set_etag(etag)
+    return resp
+
+
+def settings_body():
+    if not request.is_json:
+        return abort(400, description="Expected a JSON body")
+    return request.get_json()
+
+
+@app.route("/api/settings/<app_name>", methods=["GET", "POST", "PATCH"])
 @login_required
 def app_settings_route(app_name):
+    current_etag = lambda data, version: settings_etag(app_name, version)
+    if_match = settings_if_match(current_etag)
     if request.method == "GET":
-        return jsonify(app_settings.get(app_name, {}))
+        data, version = settings_store.get(app_name)
+        etag = settings_etag(app_name, version)
+        if request.if_none_match.contains_weak(etag):
+            resp = app.response_class(status=304)
+        else:
+            resp = jsonify(data)
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
     elif request.method == "POST":
-        data = request.json
+        data = settings_body()
         if not isinstance(data, dict):
             return abort(400, description="Invalid settings format")
-        app_settings[app_name] = data
-        return jsonify({"message": "Settings saved"})
+        return settings_saved(settings_store.update(app_name, ("replace", data), if_match), current_etag)
+    elif request.method == "PATCH":
+        patch = settings_body()
+        if isinstance(patch, list) or request.mimetype == "application/json-patch+json":
+            change = ("json-patch", patch)
+        elif isinstance(patch, dict):
+            change = ("merge", patch)
+        else:
+            return abort(400, description="Expected a merge patch object or a JSON patch list")
+        return settings_saved(settings_store.update(app_name, change, if_match), current_etag)
+
+
+@app.route("/api/settings/<app_name>/<path:key>", methods=["GET", "PUT", "DELETE"])
+@login_required
+def app_setting_key_route(app_name, key):
+    pointer = key_pointer(key)
+    if request.method == "GET":
+        data, version = settings_store.get(app_name)
+        etag = setting_key_etag(data, pointer)
+        if etag is None:
+            return abort(404, description="Setting not found")
+        if request.if_none_match.contains_weak(etag):
+            resp = app.response_class(status=304)
+        else:
+            resp = jsonify(get_path(data, pointer))
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
+    current_etag = lambda data, version: setting_key_etag(data, pointer)
+    if_match = settings_if_match(current_etag)
+    if request.method == "PUT":
+        result = settings_store.update(app_name, ("json-patch", [{"op": "add", "path": pointer, "value": settings_body()}]), if_match)
+    else:
+        try:
+            result = settings_store.update(app_name, ("json-patch", [{"op": "remove", "path": pointer}]), if_match)
+        except SettingsError as e:
+            # The only way a single remove fails to apply is a missing key
+            if e.status == 409:
+                return abort(404, description="Setting not found")
+            raise
+    return settings_saved(result, current_etag)
 
 
 ### 4. User Profiles API ###
@@ -246,12 +531,142 @@ def list_users():
 
 ### 5. Filesystem / Storage API (Very simplified) ###
 
-file_storage = {}
+# File metadata is indexed in the StoredFile table; contents live in the blob store
+blob_store = BlobStore(
+    app.config.get("FILE_STORAGE_DIR") or os.path.join(app.instance_path, "files"),
+    chunk_size=app.config["FILE_CHUNK_SIZE"]
+)
+# Shared by every worker process; its wait time shows refcount contention
+blob_store.lock = telemetry.timed_lock("blob_store", blob_store.lock)
+chunked_uploads = ChunkedUploads(
+    blob_store,
+    max_chunk_size=app.config["UPLOAD_MAX_CHUNK_SIZE"],
+    max_size=app.config["UPLOAD_MAX_SIZE"],
+    ttl_seconds=app.config["UPLOAD_SESSION_TTL"]
+)
+
+FILE_SORT_COLUMNS = {
+    "name": StoredFile.filename,
+    "size": StoredFile.size,
+    "mtime": StoredFile.uploaded_at,
+}
+FILE_PAGE_MAX = 1000
+
+def get_stored_file(app_name, filename):
+    # Served by the (app_name, filename) unique index
+    return StoredFile.query.filter_by(app_name=app_name, filename=filename).first()
+
+
+def release_blob(digest):
+    # Caller holds blob_store.lock
+    if not StoredFile.query.filter_by(sha256=digest).first():
+        blob_store.remove(digest)
+
+
+def register_file(app_name, filename, digest, size, content_type=None):
+    # Runs under blob_store.lock (see BlobStore.commit_file); if the row
+    # cannot be saved the new blob is released again
+    try:
+        stored = get_stored_file(app_name, filename)
+        previous = stored.sha256 if stored else None
+        if stored is None:
+            stored = StoredFile(app_name=app_name, filename=filename)
+            db.session.add(stored)
+        stored.size = size
+        stored.sha256 = digest
+        stored.content_type = content_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        stored.uploaded_at = int(time.time())
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        release_blob(digest)
+        raise
+    if previous and previous != digest:
+        release_blob(previous)
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+# Rows fetched per round trip by streamed list endpoints
+STREAM_FETCH_BATCH = 200
+
+
+def streamed_rows(query):
+    # Iterated by a streamed response, after the view's session has been
+    # removed; run the query on the streaming context's session instead
+    yield from query.with_session(db.session()).yield_per(STREAM_FETCH_BATCH)
+
+
+def stream_json_list(items, prefix="[", suffix="]"):
+    # JSON response encoded item by item instead of built as one string
+    return Response(
+        stream_with_context(json_array_stream(app.json.dumps, items, prefix, suffix)),
+        mimetype="application/json"
+    )
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        return abort(400, description="Invalid cursor")
+
 
 @app.route("/api/files/<app_name>", methods=["GET"])
 @login_required
 def list_files(app_name):
-    return jsonify(file_storage.get(app_name, []))
+    # Keyset pagination over (sort column, filename):
+    # ?limit=&cursor=&prefix=&q=&sort=name|size|mtime&order=asc|desc
+    sort = request.args.get("sort", "name")
+    order = request.args.get("order", "asc")
+    if sort not in FILE_SORT_COLUMNS or order not in ("asc", "desc"):
+        return abort(400, description="Invalid sort or order")
+    limit = max(1, min(request.args.get("limit", 100, type=int), FILE_PAGE_MAX))
+    column = FILE_SORT_COLUMNS[sort]
+
+    query = StoredFile.query.filter(StoredFile.app_name == app_name)
+
+    prefix = request.args.get("prefix")
+    if prefix:
+        # Range scan instead of LIKE so the filename index is used
+        query = query.filter(StoredFile.filename >= prefix, StoredFile.filename < prefix + "\U0010ffff")
+    search = request.args.get("q")
+    if search:
+        escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.filter(StoredFile.filename.like(f"%{escaped}%", escape="\\"))
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        values = decode_cursor(cursor)
+        if not isinstance(values, list) or len(values) != 2:
+            return abort(400, description="Invalid cursor")
+        last_value, last_name = values
+        if order == "asc":
+            query = query.filter(db.or_(column > last_value, db.and_(column == last_value, StoredFile.filename > last_name)))
+        else:
+            query = query.filter(db.or_(column < last_value, db.and_(column == last_value, StoredFile.filename < last_name)))
+
+    if order == "asc":
+        query = query.order_by(column.asc(), StoredFile.filename.asc())
+    else:
+        query = query.order_by(column.desc(), StoredFile.filename.desc())
+
+    # Rows are fetched in batches and encoded as they arrive; the cursor
+    # is known once the (limit + 1)th row shows there is another page
+    page = {"next_cursor": None}
+
+    def rows():
+        last = None
+        for count, row in enumerate(streamed_rows(query.limit(limit + 1))):
+            if count == limit:
+                page["next_cursor"] = encode_cursor([getattr(last, column.key), last.filename])
+                break
+            last = row
+            yield row.to_dict()
+
+    return stream_json_list(rows(), '{"files":[', lambda: '],"next_cursor":' + app.json.dumps(page["next_cursor"]) + "}")
 
 
 @app.route("/api/files/<app_name>", methods=["POST"])
@@ -260,65 +675,322 @@ def upload_file(app_name):
     if "file" not in request.files:
         return abort(400, description="No file provided")
     file = request.files["file"]
-    content = file.read()
-    # Store file in-memory for demo purposes
-    file_storage.setdefault(app_name, []).append({
-        "filename": file.filename,
-        "content": base64.b64encode(content).decode("utf-8")
-    })
-    return jsonify({"message": "File uploaded"})
+    if not valid_filename(file.filename):
+        return abort(400, description="Invalid filename")
+    digest, size = blob_store.put_stream(
+        file.stream,
+        on_commit=lambda digest, size: register_file(app_name, file.filename, digest, size, file.mimetype)
+    )
+    return jsonify({"message": "File uploaded", "sha256": digest, "size": size})
+
+
+# Resumable uploads: POST .../uploads, PUT .../uploads/<id>/<n> per chunk
+# (any order, in parallel), then POST .../uploads/<id>/commit.
+# GET .../uploads/<id> lists the chunks still missing after a reconnect.
+
+@app.errorhandler(UploadError)
+def handle_upload_error(e):
+    return jsonify({"error": str(e)}), e.status
+
+
+def upload_session_json(upload):
+    return {
+        "upload_id": upload["upload_id"],
+        "filename": upload["filename"],
+        "size": upload["size"],
+        "chunk_size": upload["chunk_size"],
+        "chunks": upload["chunks"],
+        "missing": chunked_uploads.missing(upload)
+    }
+
+
+@app.route("/api/files/<app_name>/uploads", methods=["POST"])
+@login_required
+def initiate_upload(app_name):
+    data = request.json
+    if not data or "filename" not in data or "size" not in data:
+        return abort(400, description="Missing filename or size")
+    upload = chunked_uploads.create(
+        app_name,
+        data["filename"],
+        data["size"],
+        chunk_size=data.get("chunk_size"),
+        content_type=data.get("content_type"),
+        sha256=data.get("sha256")
+    )
+    return jsonify(upload_session_json(upload)), 201
+
+
+@app.route("/api/files/<app_name>/uploads/<upload_id>", methods=["GET"])
+@login_required
+def upload_status(app_name, upload_id):
+    return jsonify(upload_session_json(chunked_uploads.get(upload_id, app_name)))
+
+
+@app.route("/api/files/<app_name>/uploads/<upload_id>/<int:index>", methods=["PUT"])
+@login_required
+def upload_chunk(app_name, upload_id, index):
+    offset = request.headers.get("X-Chunk-Offset", type=int)
+    result = chunked_uploads.write_chunk(
+        upload_id, app_name, index, offset, request.stream,
+        chunk_sha256=request.headers.get("X-Chunk-SHA256")
+    )
+    return jsonify(result)
+
+
+@app.route("/api/files/<app_name>/uploads/<upload_id>/commit", methods=["POST"])
+@login_required
+def commit_upload(app_name, upload_id):
+    digest, upload = chunked_uploads.commit(
+        upload_id, app_name,
+        on_commit=lambda digest, upload: register_file(
+            app_name, upload["filename"], digest, upload["size"], upload["content_type"]
+        )
+    )
+    return jsonify({"message": "File uploaded", "sha256": digest, "size": upload["size"]})
+
+
+@app.route("/api/files/<app_name>/uploads/<upload_id>", methods=["DELETE"])
+@login_required
+def abort_upload(app_name, upload_id):
+    chunked_uploads.abort(upload_id, app_name)
+    return jsonify({"message": "Upload aborted"})
+
+
+@app.route("/api/files/<app_name>/<filename>", methods=["GET"])
+@login_required
+def download_file(app_name, filename):
+    stored = get_stored_file(app_name, filename)
+    if not stored:
+        return abort(404, description="File not found")
+    # conditional=True gives Range/If-Range support; the file body goes out
+    # through wsgi.file_wrapper (sendfile) or X-Sendfile when enabled
+    return send_file(
+        blob_store.path(stored.sha256),
+        mimetype=stored.content_type,
+        as_attachment=True,
+        download_name=stored.filename,
+        conditional=True,
+        etag=stored.sha256,
+        max_age=0
+    )
 
 
 @app.route("/api/files/<app_name>/<filename>", methods=["DELETE"])
 @login_required
 def delete_file(app_name, filename):
-    files = file_storage.get(app_name, [])
-    before = len(files)
-    files = [f for f in files if f["filename"] != filename]
-    if len(files) == before:
-        return abort(404, description="File not found")
-    file_storage[app_name] = files
+    with blob_store.lock:
+        stored = get_stored_file(app_name, filename)
+        if not stored:
+            return abort(404, description="File not found")
+        digest = stored.sha256
+        db.session.delete(stored)
+        db.session.commit()
+        release_blob(digest)
     return jsonify({"message": "File deleted"})
 
 
 ### 6. Event Log / Audit Trail API ###
 
+event_log = EventLog(
+    app.config.get("EVENT_LOG_DIR") or os.path.join(app.instance_path, "logs"),
+    segment_bytes=app.config["EVENT_LOG_SEGMENT_BYTES"],
+    retention_seconds=app.config["EVENT_LOG_RETENTION_DAYS"] * 24 * 3600,
+    fsync=app.config["EVENT_LOG_FSYNC"]
+)
+
+
+def make_write_buffer(flush, name):
+    buffer = WriteBuffer(
+        flush,
+        max_items=app.config["WRITE_BUFFER_MAX_ITEMS"],
+        max_delay=app.config["WRITE_BUFFER_MAX_DELAY_MS"] / 1000.0,
+        name=name
+    )
+    # Drain pending writes on a clean shutdown
+    atexit.register(buffer.close)
+    return buffer
+
+
+def bulk_items(key):
+    # Bulk endpoints accept a JSON array or {"<key>": [...]}
+    data = request.json
+    if isinstance(data, dict):
+        data = data.get(key)
+    if not isinstance(data, list) or not data:
+        return abort(400, description=f"Expected a non-empty list of {key}")
+    if len(data) > app.config["BULK_MAX_ITEMS"]:
+        return abort(413, description=f"At most {app.config['BULK_MAX_ITEMS']} {key} per request")
+    return data
+
+
+log_buffer = make_write_buffer(event_log.append_many, "log-writer")
+
 @app.route("/api/logs", methods=["GET", "POST"])
 @login_required
 def logs():
     if request.method == "GET":
-        return jsonify(app_logs)
+        # Streams NDJSON, one event per line: ?since=&until= (unix seconds), ?limit=
+        since = request.args.get("since", type=float)
+        until = request.args.get("until", type=float)
+        limit = request.args.get("limit", type=int)
+        return Response(event_log.query(since, until, limit), mimetype="application/x-ndjson")
     elif request.method == "POST":
         data = request.json
         if not data or "event" not in data:
             return abort(400, description="Missing event data")
-        app_logs.append({
+        log_buffer.submit([{
             "event": data["event"],
             "timestamp": int(time.time())
-        })
+        }])
         return jsonify({"message": "Log added"})
 
 
+@app.route("/api/logs/bulk", methods=["POST"])
+@login_required
+def logs_bulk():
+    events = bulk_items("events")
+    now = int(time.time())
+    if not all(isinstance(e, dict) and "event" in e for e in events):
+        return abort(400, description="Missing event data")
+    count = log_buffer.submit([{"event": e["event"], "timestamp": now} for e in events])
+    return jsonify({"message": "Logs added", "count": count})
+
+
 ### 7. Notification API ###
 
+def notification_channel(user_id):
+    return f"notifications:{user_id}"
+
+
+def save_notifications(items):
+    try:
+        rows = [Notification(**item) for item in items]
+        db.session.add_all(rows)
+        db.session.commit()
+        return rows
+    except SQLAlchemyError:
+        db.session.rollback()
+    # Retry one by one so a bad row only loses itself, not the whole batch
+    rows = []
+    for item in items:
+        try:
+            row = Notification(**item)
+            db.session.add(row)
+            db.session.commit()
+            rows.append(row)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"[notification-writer] Dropped notification for user {item.get('user_id')}: {e}")
+    return rows
+
+
+def flush_notifications(items):
+    with app.app_context():
+        rows = save_notifications(items)
+        # Push to anyone subscribed through /api/notifications/stream
+        for row in rows:
+            message_bus.send("notifications", notification_channel(row.user_id), row.to_dict())
+
+
+def notification_item(data):
+    # Validated here, before the group commit, so one bad request cannot
+    # fail the batch it shares with others
+    message = data["message"]
+    user_id = data.get("user_id", current_user.id)
+    if not isinstance(message, (str, int, float)) or isinstance(message, bool):
+        return abort(400, description="message must be a string")
+    try:
+        if isinstance(user_id, bool):
+            raise TypeError
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return abort(400, description="user_id must be an integer")
+    return {
+        "message": str(message),
+        "user_id": user_id,
+        "created_at": datetime.utcnow()
+    }
+
+
+notification_buffer = make_write_buffer(flush_notifications, "notification-writer")
+
 @app.route("/api/notify", methods=["POST"])
 @login_required
 def notify():
     data = request.json
     if not data or "message" not in data:
         return abort(400, description="Missing message")
-    app_notifications.append({
-        "message": data["message"],
-        "timestamp": int(time.time()),
-        "read": False
-    })
+    notification_buffer.submit([notification_item(data)])
     return jsonify({"message": "Notification created"})
 
 
+@app.route("/api/notify/bulk", methods=["POST"])
+@login_required
+def notify_bulk():
+    notifications = bulk_items("notifications")
+    if not all(isinstance(n, dict) and "message" in n for n in notifications):
+        return abort(400, description="Missing message")
+    count = notification_buffer.submit([notification_item(n) for n in notifications])
+    return jsonify({"message": "Notifications created", "count": count})
+
+
 @app.route("/api/notifications", methods=["GET"])
 @login_required
 def get_notifications():
-    return jsonify(app_notifications)
+    # ?since_id= returns only newer notifications (oldest first); without it
+    # the newest ?limit= are returned. ?unread=1 restricts to unread ones.
+    limit = max(1, min(request.args.get("limit", 100, type=int), 1000))
+    since_id = request.args.get("since_id", type=int)
+    query = Notification.query.filter(Notification.user_id == current_user.id)
+    if request.args.get("unread") in ("1", "true"):
+        query = query.filter(Notification.read.is_(False))
+
+    if since_id is not None:
+        query = query.filter(Notification.id > since_id).order_by(Notification.id.asc()).limit(limit)
+    else:
+        # Newest `limit` ids, then re-read oldest first so rows can be streamed
+        newest = query.with_entities(Notification.id).order_by(Notification.id.desc()).limit(limit).subquery()
+        query = Notification.query.filter(Notification.id.in_(db.select(newest.c.id))).order_by(Notification.id.asc())
+    return stream_json_list(n.to_dict() for n in streamed_rows(query))
+
+
+@app.route("/api/notifications/unread_count", methods=["GET"])
+@login_required
+def unread_notification_count():
+    # Counted from the (user_id, read, created_at) index
+    count = Notification.query.filter(
+        Notification.user_id == current_user.id,
+        Notification.read.is_(False)
+    ).count()
+    return jsonify({"unread": count})
+
+
+@app.route("/api/notifications/read", methods=["POST"])
+@login_required
+def mark_notifications_read():
+    # Body: {"ids": [...]} or {"up_to_id": N} or {"all": true}
+    data = request.json or {}
+    query = Notification.query.filter(
+        Notification.user_id == current_user.id,
+        Notification.read.is_(False)
+    )
+    if isinstance(data.get("ids"), list):
+        query = query.filter(Notification.id.in_(data["ids"]))
+    elif isinstance(data.get("up_to_id"), int):
+        query = query.filter(Notification.id <= data["up_to_id"])
+    elif data.get("all") is not True:
+        return abort(400, description="Expected ids, up_to_id or all")
+    updated = query.update({Notification.read: True}, synchronize_session=False)
+    db.session.commit()
+    return jsonify({"message": "Notifications marked read", "updated": updated})
+
+
+@app.route("/api/notifications/stream", methods=["GET"])
+@login_required
+def stream_notifications():
+    # Server-Sent Events for new notifications of the current user
+    return sse_response(notification_channel(current_user.id), request.args.get("subscriber", "default"))
 
 
 ### 8. Auth & Permissions API (Basic stubs) ###
@@ -348,36 +1020,58 @@ def auth_login():
 @app.route("/api/auth/logout", methods=["POST"])
 @login_required
 def auth_logout():
-    logout_user()
+    logout_and_forget()
     return jsonify({"message": "Logged out"})
 
 
+@app.route("/api/cache/stats")
+@login_required
+def cache_stats():
+    return jsonify({"user": user_cache.stats()})
+
+
 @app.route("/api/permissions/<app_name>")
 @login_required
 def get_app_permissions(app_name):
     # Stub: for demo, return full permissions
     return jsonify({"app": app_name, "permissions": ["read", "write", "execute"]})
 
+ICON_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
 @app.route("/api/icons/<source>/<folder>")
 def get_app_icon(source, folder):
-    base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../apps"))
-    icon_dir = os.path.join(base_path, source, folder, "icons")
-
-    for filename in ["icon.png", "icon.webp", "icon.svg", "icon.jpg"]:
-        file_path = os.path.join(icon_dir, filename)
-        if os.path.isfile(file_path):
-            return send_from_directory(icon_dir, filename, mimetype=mimetypes.guess_type(file_path)[0])
-
-    abort(404, description="Icon not found")
+    # /api/apps links ?v=<content hash>; such URLs never change content and
+    # are cached for a year. ?size=N and ?format=webp select a variant.
+    icon = icon_resolver.resolve(source, folder)
+    if icon is None:
+        abort(404, description="Icon not found")
+    size = request.args.get("size", type=int)
+    fmt = request.args.get("format")
+    if (size is not None and size not in icon_resolver.sizes) or fmt not in (None, "webp"):
+        abort(400, description="Unsupported icon size or format")
+
+    data, mimetype, etag = icon_resolver.variant(icon, size, fmt)
+    if data is None:
+        resp = send_file(icon["path"], mimetype=mimetype, etag=etag, conditional=True)
+    else:
+        resp = app.response_class(data, mimetype=mimetype)
+        resp.set_etag(etag)
+        resp.make_conditional(request)
+    if request.args.get("v") == icon["digest"]:
+        resp.cache_control.public = True
+        resp.cache_control.max_age = ICON_IMMUTABLE_MAX_AGE
+        resp.cache_control.immutable = True
+    else:
+        resp.cache_control.no_cache = True
+    return resp
 
 @app.route("/logout")
 @login_required
 def logout():
-    logout_user()
+    logout_and_forget()
     flash("Logged out.", "info")
     return redirect(url_for("index"))
 
 if __name__ == "__main__":
-    with app.app_context():
-        db.create_all()
+    # Development server; see serve.py for the production one
     app.run(debug=True)
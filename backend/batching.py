@@ -0,0 +1,73 @@
+import time
+import threading
+
+
+class _Batch:
+    def __init__(self):
+        self.items = []
+        self.started = None
+        self.done = threading.Event()
+        self.error = None
+        self.urgent = False
+
+
+class WriteBuffer:
+    # Group commit: items from any number of requests are collected and
+    # handed to flush(items) in one call every max_delay seconds or
+    # max_items items, whichever comes first. submit(wait=True) returns only
+    # once the caller's items have been flushed, so a 200 still means durable;
+    # urgent=True flushes the current batch without waiting out max_delay.
+    def __init__(self, flush, max_items=500, max_delay=0.02, name="write-buffer"):
+        self.flush = flush
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._current = _Batch()
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, items, wait=True, urgent=False):
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("Write buffer is closed")
+            batch = self._current
+            if batch.started is None:
+                batch.started = time.monotonic()
+            batch.items.extend(items)
+            batch.urgent = batch.urgent or urgent
+            self._cond.notify()
+        if wait:
+            batch.done.wait()
+            if batch.error is not None:
+                raise batch.error
+        return len(items)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._current.items and not self._closing:
+                    self._cond.wait()
+                if not self._current.items:
+                    return
+                deadline = self._current.started + self.max_delay
+                while len(self._current.items) < self.max_items and not self._closing and not self._current.urgent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._current = self._current, _Batch()
+
+            try:
+                self.flush(batch.items)
+            except Exception as e:
+                print(f"[{self._thread.name}] Flush of {len(batch.items)} item(s) failed: {e}")
+                batch.error = e
+            batch.done.set()
+
+    def close(self):
+        # Flushes whatever is pending; called on clean shutdown
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join()
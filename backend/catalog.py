@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import configparser
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class AppCatalog:
+    # In-process index of apps/<source>/<folder>/config.ini.
+    # Directory listings are only redone when a directory's mtime changes and
+    # config.ini files are only re-parsed when their own mtime changes, so a
+    # refresh on an unchanged tree costs one stat per directory/config.
+    # With an IconResolver, "icon" is a content-hashed URL (or None when the
+    # app has no icon) and an icon change also changes the catalog ETag.
+    def __init__(self, base_dir, recheck_seconds=2.0, icons=None):
+        self.base_dir = os.path.abspath(base_dir)
+        self.recheck_seconds = recheck_seconds
+        self.icons = icons
+        self._lock = threading.Lock()
+        self._base_mtime = None
+        self._sources = {}   # source -> {"mtime": ..., "folders": [...]}
+        self._entries = {}   # (source, folder) -> {"mtime": ..., "app": {...}}
+        self._apps = []
+        self._etag = None
+        self._checked_at = 0.0
+
+    def _parse(self, source, app_folder, config_path):
+        config = configparser.ConfigParser()
+        config.read(config_path)
+        section = config["App"] if "App" in config else config["DEFAULT"]
+        return {
+            "name": section.get("name", app_folder),
+            "description": section.get("description", ""),
+            "icon": self._icon_url(source, app_folder),
+            "launchUrl": section.get("launchUrl", f"/apps/{source}/{app_folder}/start.py"),
+            "source": source,
+            "folder": app_folder
+        }
+
+    def _icon_url(self, source, app_folder):
+        if self.icons is None:
+            return f"/api/icons/{source}/{app_folder}"
+        return self.icons.url(source, app_folder)
+
+    def _list_dirs(self, path):
+        try:
+            names = os.listdir(path)
+        except OSError:
+            return []
+        return sorted(n for n in names if os.path.isdir(os.path.join(path, n)))
+
+    def _refresh(self):
+        changed = False
+
+        base_mtime = _mtime(self.base_dir)
+        if base_mtime != self._base_mtime:
+            self._base_mtime = base_mtime
+            sources = self._list_dirs(self.base_dir)
+            for gone in set(self._sources) - set(sources):
+                del self._sources[gone]
+                changed = True
+            for source in sources:
+                self._sources.setdefault(source, {"mtime": None, "folders": []})
+
+        seen = set()
+        for source, state in self._sources.items():
+            source_path = os.path.join(self.base_dir, source)
+            source_mtime = _mtime(source_path)
+            if source_mtime != state["mtime"]:
+                state["mtime"] = source_mtime
+                state["folders"] = self._list_dirs(source_path)
+
+            for app_folder in state["folders"]:
+                key = (source, app_folder)
+                config_path = os.path.join(source_path, app_folder, "config.ini")
+                config_mtime = _mtime(config_path)
+                entry = self._entries.get(key)
+
+                if config_mtime is None:
+                    if entry is not None:
+                        del self._entries[key]
+                        changed = True
+                    continue
+
+                seen.add(key)
+                if entry is None or entry["mtime"] != config_mtime:
+                    self._entries[key] = {
+                        "mtime": config_mtime,
+                        "app": self._parse(source, app_folder, config_path)
+                    }
+                    changed = True
+                elif self.icons is not None:
+                    icon = self._icon_url(source, app_folder)
+                    if entry["app"]["icon"] != icon:
+                        entry["app"] = dict(entry["app"], icon=icon)
+                        changed = True
+
+        for gone in set(self._entries) - seen:
+            del self._entries[gone]
+            changed = True
+
+        if changed or self._etag is None:
+            self._apps = [self._entries[key]["app"] for key in sorted(self._entries)]
+            body = json.dumps(self._apps, sort_keys=True).encode("utf-8")
+            self._etag = hashlib.sha1(body).hexdigest()
+
+    def snapshot(self):
+        # Returns (apps, etag). Rechecks the filesystem at most once per
+        # recheck_seconds, so polling clients mostly hit the cached list.
+        with self._lock:
+            now = time.monotonic()
+            if self._etag is None or now - self._checked_at >= self.recheck_seconds:
+                self._refresh()
+                self._checked_at = now
+            return self._apps, self._etag
+
+    def invalidate(self):
+        with self._lock:
+            self._checked_at = 0.0
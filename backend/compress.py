@@ -0,0 +1,139 @@
+import gzip
+import zlib
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "image/svg+xml", "text/html", "text/plain", "text/css", "text/csv"
+)
+
+
+class _Stream:
+    # Incremental encoder with one interface for every coding
+    def __init__(self, coding, level):
+        if coding == "gzip":
+            obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self.compress = obj.compress
+            self.flush = lambda: obj.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = obj.flush
+        elif coding == "br":
+            obj = brotli.Compressor(quality=level)
+            self.compress = obj.process
+            self.flush = obj.flush
+            self.finish = obj.finish
+        else:
+            obj = zstandard.ZstdCompressor(level=level).compressobj()
+            self.compress = obj.compress
+            self.flush = lambda: obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            self.finish = obj.flush
+
+
+class Compressor:
+    # Negotiated Content-Encoding for text responses (zstd, br, gzip; the
+    # first one the client accepts in `codings` order wins). Whole bodies
+    # with a strong ETag are compressed once and kept in a small LRU keyed by
+    # (url, etag, coding); streamed bodies are compressed as they are produced and
+    # flushed every `flush_bytes` of input. The ETag becomes weak, as the
+    # bytes differ from the identity representation.
+    def __init__(self, app, codings=("zstd", "br", "gzip"), min_size=1024,
+                 levels=None, cache_entries=64, flush_bytes=64 * 1024):
+        available = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+        self.codings = [c for c in codings if available.get(c)]
+        self.levels = {"gzip": 6, "br": 5, "zstd": 3}
+        self.levels.update(levels or {})
+        self.min_size = min_size
+        self.cache_entries = cache_entries
+        self.flush_bytes = flush_bytes
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        app.after_request(self.compress_response)
+
+    def _negotiate(self):
+        accept = request.accept_encodings
+        for coding in self.codings:
+            if accept.quality(coding) > 0:
+                return coding
+        return None
+
+    def _compress(self, coding, data):
+        level = self.levels[coding]
+        if coding == "gzip":
+            return gzip.compress(data, compresslevel=level, mtime=0)
+        if coding == "br":
+            return brotli.compress(data, quality=level)
+        return zstandard.ZstdCompressor(level=level).compress(data)
+
+    def _cached(self, key, coding, data):
+        if key is None:
+            return self._compress(coding, data)
+        with self._lock:
+            body = self._cache.get(key)
+            if body is not None:
+                self._cache.move_to_end(key)
+                return body
+        body = self._compress(coding, data)
+        with self._lock:
+            self._cache[key] = body
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return body
+
+    def _stream(self, coding, iterable):
+        encoder = _Stream(coding, self.levels[coding])
+        pending = 0
+        try:
+            for chunk in iterable:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode("utf-8")
+                out = encoder.compress(chunk)
+                pending += len(chunk)
+                if pending >= self.flush_bytes:
+                    out += encoder.flush()
+                    pending = 0
+                if out:
+                    yield out
+            yield encoder.finish()
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+
+    def compress_response(self, response):
+        if response.mimetype not in COMPRESSIBLE_TYPES:
+            return response
+        response.vary.add("Accept-Encoding")
+        if (request.method == "HEAD" or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or "Content-Encoding" in response.headers or response.direct_passthrough
+                or "no-transform" in response.headers.get("Cache-Control", "")):
+            return response
+        coding = self._negotiate()
+        if coding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        if response.is_streamed:
+            response.response = self._stream(coding, response.response)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            # An ETag is only unique within one resource, so the URL is part of the key
+            key = (request.url, etag, coding) if etag and not weak else None
+            response.set_data(self._cached(key, coding, data))
+        response.headers["Content-Encoding"] = coding
+        if etag:
+            response.set_etag(etag, weak=True)
+        return response
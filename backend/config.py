@@ -3,7 +3,84 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def engine_options(url):
+    # In-memory SQLite gets a single-connection pool that takes no sizing
+    # options; every other URL uses a QueuePool
+    if url.startswith("sqlite") and (url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url):
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+    }
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev_secret")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///app.db")
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # SQLite: WAL lets readers run alongside the writer
+    SQLITE_WAL = os.getenv("SQLITE_WAL", "1") == "1"
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+    # Identity cache for load_user; with several server workers a change is
+    # seen by the other workers within USER_CACHE_TTL
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+
+    # App settings: cached documents are re-read from the database after
+    # SETTINGS_CACHE_TTL; changes without If-Match within
+    # SETTINGS_WRITE_DELAY_MS are saved together in one transaction
+    SETTINGS_CACHE_TTL = float(os.getenv("SETTINGS_CACHE_TTL", "2"))
+    SETTINGS_WRITE_DELAY_MS = float(os.getenv("SETTINGS_WRITE_DELAY_MS", "500"))
+
+    # apps/<source>/<folder> tree (defaults to ../apps next to the backend)
+    APPS_DIR = os.getenv("APPS_DIR")
+    # Seconds between filesystem rechecks of the /api/apps catalog
+    APP_CATALOG_RECHECK_SECONDS = float(os.getenv("APP_CATALOG_RECHECK_SECONDS", "2"))
+
+    # App icons: lookups are rechecked this often; ICON_SIZES are the
+    # ?size= variants (rendered with Pillow when installed) stored under
+    # ICON_VARIANT_DIR (defaults to <instance>/icons)
+    ICON_RECHECK_SECONDS = float(os.getenv("ICON_RECHECK_SECONDS", "2"))
+    ICON_SIZES = [int(s) for s in os.getenv("ICON_SIZES", "32,64,128,256").split(",") if s.strip()]
+    ICON_VARIANT_DIR = os.getenv("ICON_VARIANT_DIR")
+
+    # On-disk blob storage for the Files API (defaults to <instance>/files)
+    FILE_STORAGE_DIR = os.getenv("FILE_STORAGE_DIR")
+    FILE_CHUNK_SIZE = int(os.getenv("FILE_CHUNK_SIZE", str(1024 * 1024)))
+    # Let a fronting server (nginx/Apache) stream downloads via X-Sendfile
+    USE_X_SENDFILE = os.getenv("USE_X_SENDFILE", "0") == "1"
+    # Resumable chunked uploads
+    UPLOAD_MAX_CHUNK_SIZE = int(os.getenv("UPLOAD_MAX_CHUNK_SIZE", str(64 * 1024 * 1024)))
+    UPLOAD_MAX_SIZE = int(os.getenv("UPLOAD_MAX_SIZE", str(16 * 1024 ** 3)))
+    UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))
+    # Plugin message bus: per-receiver queue bound and long-poll/SSE timing
+    MESSAGE_QUEUE_SIZE = int(os.getenv("MESSAGE_QUEUE_SIZE", "1000"))
+    MESSAGE_MAX_WAIT = float(os.getenv("MESSAGE_MAX_WAIT", "30"))
+    MESSAGE_SSE_HEARTBEAT = float(os.getenv("MESSAGE_SSE_HEARTBEAT", "15"))
+    # "memory" (one process) or "database" (shared by several server workers)
+    MESSAGE_BUS = os.getenv("MESSAGE_BUS", "memory")
+    MESSAGE_POLL_INTERVAL = float(os.getenv("MESSAGE_POLL_INTERVAL", "0.1"))
+    # Audit log segments (defaults to <instance>/logs)
+    EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR")
+    EVENT_LOG_SEGMENT_BYTES = int(os.getenv("EVENT_LOG_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+    EVENT_LOG_RETENTION_DAYS = float(os.getenv("EVENT_LOG_RETENTION_DAYS", "365"))
+    EVENT_LOG_FSYNC = os.getenv("EVENT_LOG_FSYNC", "0") == "1"
+    # Group commit for log/notification ingest and the bulk endpoint cap
+    WRITE_BUFFER_MAX_ITEMS = int(os.getenv("WRITE_BUFFER_MAX_ITEMS", "500"))
+    WRITE_BUFFER_MAX_DELAY_MS = float(os.getenv("WRITE_BUFFER_MAX_DELAY_MS", "20"))
+    BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+    # Requests slower than this many ms get a sampled stack profile written
+    # to PROFILE_DIR (defaults to <instance>/profiles) as folded stacks; 0 = off
+    PROFILE_SLOW_REQUEST_MS = float(os.getenv("PROFILE_SLOW_REQUEST_MS", "0"))
+    PROFILE_SAMPLE_MS = float(os.getenv("PROFILE_SAMPLE_MS", "5"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR")
+    # Response compression, in order of preference; br and zstd need the
+    # brotli / zstandard packages. Smaller bodies are sent as they are.
+    COMPRESS_CODINGS = [c.strip() for c in os.getenv("COMPRESS_CODINGS", "zstd,br,gzip").split(",") if c.strip()]
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    # Encode JSON with orjson when it is installed ("stdlib" to disable)
+    JSON_ENCODER = os.getenv("JSON_ENCODER", "auto")
+    # /api?samples=1 recomputes sample data at most this often
+    API_SAMPLES_TTL = float(os.getenv("API_SAMPLES_TTL", "5"))
@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import bisect
+
+from filelock import FileLock
+
+
+class Segment:
+    def __init__(self, path, number):
+        self.path = path
+        self.number = number
+        self.start_ts = None
+        self.end_ts = None
+        self.size = 0
+        # Sparse index: parallel lists of (timestamp, byte offset), one entry
+        # roughly every index_interval bytes
+        self.index_ts = None
+        self.index_pos = None
+
+    @property
+    def index_path(self):
+        return self.path[:-len(".ndjson")] + ".idx"
+
+
+class EventLog:
+    # Durable append-only audit log split into fixed-size NDJSON segments.
+    # Each segment has a sparse time index, so a range query seeks close to
+    # `since` in the first relevant segment and skips the others entirely.
+    # Whole segments older than the retention window are deleted. Several
+    # worker processes may share one root: writes happen under a file lock,
+    # and each process catches up with the others' appends before its own.
+    def __init__(self, root, segment_bytes=16 * 1024 * 1024, index_interval=64 * 1024,
+                 retention_seconds=365 * 24 * 3600, fsync=False):
+        self.root = os.path.abspath(root)
+        self.segment_bytes = segment_bytes
+        self.index_interval = index_interval
+        self.retention_seconds = retention_seconds
+        self.fsync = fsync
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = FileLock(os.path.join(self.root, ".lock"))
+        self._segments = []
+        self._last_ts = 0
+        self._since_index = 0
+        self._fd = None
+        with self._lock:
+            self._load()
+
+    def _load(self):
+        self._scan()
+        if self._segments:
+            self._open_active()
+        else:
+            self._roll()
+        self._enforce_retention()
+
+    def _scan(self):
+        # (Re)reads the segment list; segments already known keep their
+        # index unless they grew since
+        known = {s.number: s for s in self._segments}
+        segments = []
+        for name in sorted(os.listdir(self.root)):
+            if not name.endswith(".ndjson"):
+                continue
+            number = int(name.split(".")[0])
+            segment = known.get(number) or Segment(os.path.join(self.root, name), number)
+            try:
+                size = os.path.getsize(segment.path)
+            except FileNotFoundError:
+                continue
+            if size != segment.size:
+                segment.size = size
+                segment.index_ts = segment.index_pos = None
+            segments.append(segment)
+        self._segments = segments
+
+        for segment in segments[:-1]:
+            if segment.start_ts is None:
+                segment.start_ts = self._first_ts(segment)
+        if segments and segments[-1].index_pos is None:
+            # The active segment is bounded by segment_bytes; scan it fully
+            self._adopt_active(0)
+
+    def _adopt_active(self, pos):
+        # Indexes the active segment from byte `pos` to its end
+        active = self._segments[-1]
+        valid = self._build_index(active, pos)
+        if valid != os.path.getsize(active.path):
+            # Drop a torn final line left by a crash mid-write
+            with open(active.path, "r+b") as f:
+                f.truncate(valid)
+        active.size = valid
+        self._last_ts = max(self._last_ts, active.end_ts or active.start_ts or 0)
+        self._since_index = active.size - (active.index_pos[-1] if active.index_pos else 0)
+
+    def _open_active(self):
+        self._fd = os.open(self._segments[-1].path, os.O_WRONLY | os.O_APPEND | getattr(os, "O_BINARY", 0))
+
+    def _sync(self):
+        # Called with the lock held: catch up with other processes' writes
+        active = self._segments[-1]
+        if os.path.exists(os.path.join(self.root, f"{active.number + 1:010d}.ndjson")):
+            # Someone else rolled to a new segment
+            os.close(self._fd)
+            self._scan()
+            self._open_active()
+        elif os.fstat(self._fd).st_size > active.size:
+            self._adopt_active(active.size)
+
+    def _first_ts(self, segment):
+        with open(segment.path, "rb") as f:
+            line = f.readline()
+        try:
+            return json.loads(line)["timestamp"]
+        except (ValueError, KeyError):
+            return None
+
+    def _build_index(self, segment, pos=0):
+        # Indexes from byte `pos` on, extending the existing index when pos > 0;
+        # returns the offset just past the last complete line
+        if pos == 0 or segment.index_pos is None:
+            segment.index_ts, segment.index_pos = [], []
+        ts_list, pos_list = segment.index_ts, segment.index_pos
+        last_indexed = pos_list[-1] if pos_list else None
+        with open(segment.path, "rb") as f:
+            f.seek(pos)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    ts = json.loads(line)["timestamp"]
+                except (ValueError, KeyError):
+                    pos += len(line)
+                    continue
+                if segment.start_ts is None:
+                    segment.start_ts = ts
+                segment.end_ts = ts
+                if last_indexed is None or pos - last_indexed >= self.index_interval:
+                    ts_list.append(ts)
+                    pos_list.append(pos)
+                    last_indexed = pos
+                pos += len(line)
+        return pos
+
+    def _load_index(self, segment):
+        if segment.index_ts is not None:
+            return
+        try:
+            with open(segment.index_path) as f:
+                pairs = json.load(f)
+            segment.index_ts = [p[0] for p in pairs]
+            segment.index_pos = [p[1] for p in pairs]
+        except (OSError, ValueError):
+            self._build_index(segment)
+
+    def _roll(self):
+        # Called with the lock held: seal the active segment and start a new one
+        if self._fd is not None:
+            os.close(self._fd)
+            active = self._segments[-1]
+            with open(active.index_path, "w") as f:
+                json.dump(list(zip(active.index_ts, active.index_pos)), f)
+        number = self._segments[-1].number + 1 if self._segments else 0
+        segment = Segment(os.path.join(self.root, f"{number:010d}.ndjson"), number)
+        segment.index_ts, segment.index_pos = [], []
+        self._segments.append(segment)
+        self._since_index = 0
+        self._fd = os.open(segment.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        self._enforce_retention()
+
+    def append_many(self, events):
+        # events: iterable of dicts; each gets a non-decreasing "timestamp"
+        with self._lock:
+            self._sync()
+            active = self._segments[-1]
+            buf = bytearray()
+            for event in events:
+                ts = max(int(event.get("timestamp") or time.time()), self._last_ts)
+                self._last_ts = ts
+                record = dict(event, timestamp=ts)
+                line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+                if active.size + len(buf) > 0 and active.size + len(buf) + len(line) > self.segment_bytes:
+                    self._write(active, buf)
+                    buf = bytearray()
+                    self._roll()
+                    active = self._segments[-1]
+
+                pos = active.size + len(buf)
+                if active.start_ts is None:
+                    active.start_ts = ts
+                active.end_ts = ts
+                if not active.index_pos or self._since_index >= self.index_interval:
+                    active.index_ts.append(ts)
+                    active.index_pos.append(pos)
+                    self._since_index = 0
+                self._since_index += len(line)
+                buf += line
+            self._write(active, buf)
+
+    def append(self, event):
+        self.append_many([event])
+
+    def _write(self, segment, buf):
+        if not buf:
+            return
+        view = memoryview(buf)
+        while view:
+            written = os.write(self._fd, view)
+            view = view[written:]
+        if self.fsync:
+            os.fsync(self._fd)
+        segment.size += len(buf)
+
+    def _enforce_retention(self):
+        cutoff = time.time() - self.retention_seconds
+        # A segment can go once the *next* segment starts before the cutoff
+        while len(self._segments) > 1:
+            next_start = self._segments[1].start_ts
+            if next_start is None or next_start >= cutoff:
+                break
+            segment = self._segments.pop(0)
+            for path in (segment.path, segment.index_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+        self._lock.close()
+
+    def query(self, since=None, until=None, limit=None):
+        # Yields raw NDJSON lines (bytes) with since <= timestamp <= until
+        if limit is not None and limit <= 0:
+            return
+        with self._lock:
+            self._sync()
+            snapshot = [(s, s.size) for s in self._segments if s.size]
+
+        starts = [s.start_ts or 0 for s, _ in snapshot]
+        first = 0
+        if since is not None:
+            first = max(bisect.bisect_left(starts, since) - 1, 0)
+
+        count = 0
+        for segment, end in snapshot[first:]:
+            if until is not None and (segment.start_ts or 0) > until:
+                return
+            offset = 0
+            if since is not None:
+                self._load_index(segment)
+                i = bisect.bisect_left(segment.index_ts, since) - 1
+                if i >= 0:
+                    offset = segment.index_pos[i]
+            try:
+                f = open(segment.path, "rb")
+            except FileNotFoundError:
+                continue  # removed by retention while we were reading
+            with f:
+                f.seek(offset)
+                while f.tell() < end:
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        break
+                    ts = json.loads(line)["timestamp"]
+                    if since is not None and ts < since:
+                        continue
+                    if until is not None and ts > until:
+                        return
+                    yield line
+                    count += 1
+                    if limit is not None and count >= limit:
+                        return
@@ -0,0 +1,58 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    # Flask's JSON provider with orjson doing the encoding. Dates, decimals
+    # etc. still go through Flask's default() so the output matches the
+    # stdlib provider; anything orjson rejects falls back to it.
+    def _options(self):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps_bytes(self, obj):
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._options())
+        except TypeError:
+            return super().dumps(obj).encode("utf-8")
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+
+def json_array_stream(dumps, items, prefix="[", suffix="]", batch_bytes=64 * 1024):
+    # Encodes `items` one at a time and yields them in ~batch_bytes chunks,
+    # so a large list never exists as one string. `suffix` may be a callable,
+    # evaluated once `items` is exhausted (e.g. to emit a next-page cursor).
+    buf = [prefix]
+    size = len(prefix)
+    first = True
+    for item in items:
+        text = dumps(item) if first else "," + dumps(item)
+        first = False
+        buf.append(text)
+        size += len(text)
+        if size >= batch_bytes:
+            yield "".join(buf)
+            buf, size = [], 0
+    buf.append(suffix() if callable(suffix) else suffix)
+    yield "".join(buf)
@@ -0,0 +1,53 @@
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: no multi-process server there, threads only
+    fcntl = None
+
+
+class FileLock:
+    # Reentrant lock shared by threads *and* worker processes: a thread-level
+    # RLock plus an advisory flock on `path`. Used for on-disk state that
+    # several server workers write (blob refcounts, upload sessions, the
+    # event log). The file is reopened after a fork so parent and child do
+    # not share one lock.
+    def __init__(self, path):
+        self.path = path
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+        self._pid = None
+
+    def acquire(self):
+        self._rlock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                if self._fd is None or self._pid != os.getpid():
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                    self._pid = os.getpid()
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                self._rlock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and fcntl is not None and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._rlock.release()
+
+    def close(self):
+        with self._rlock:
+            if self._fd is not None and self._pid == os.getpid():
+                os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,137 @@
+import io
+import os
+import time
+import stat
+import hashlib
+import mimetypes
+import threading
+
+from werkzeug.security import safe_join
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+ICON_NAMES = ("icon.png", "icon.webp", "icon.svg", "icon.jpg")
+
+
+class IconResolver:
+    # Finds apps/<source>/<folder>/icons/icon.* and remembers the answer
+    # (including "no icon") for recheck_seconds. Each icon is identified by
+    # a hash of its content, which /api/apps puts in the URL so browsers can
+    # cache it forever. Small icons are kept in memory; resized and webp
+    # variants are rendered once with Pillow (when installed) and stored
+    # under variant_dir, where every server worker can reuse them.
+    def __init__(self, base_dir, variant_dir, sizes=(), recheck_seconds=2.0, max_inline=256 * 1024):
+        self.base_dir = os.path.abspath(base_dir)
+        self.variant_dir = variant_dir
+        self.sizes = set(sizes)
+        self.recheck_seconds = recheck_seconds
+        self.max_inline = max_inline
+        self._lock = threading.Lock()
+        self._entries = {}   # (source, folder) -> {"checked_at": ..., "icon": {...} or None}
+
+    def _find(self, source, folder):
+        icon_dir = safe_join(self.base_dir, source, folder, "icons")
+        if icon_dir is None or not os.path.isdir(icon_dir):
+            return None, None
+        for name in ICON_NAMES:
+            path = os.path.join(icon_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                return path, st
+        return None, None
+
+    def _load(self, path, st):
+        with open(path, "rb") as f:
+            data = f.read()
+        return {
+            "path": path,
+            "mtime": st.st_mtime_ns,
+            "size": st.st_size,
+            "digest": hashlib.sha256(data).hexdigest()[:16],
+            "mimetype": mimetypes.guess_type(path)[0] or "application/octet-stream",
+            "data": data if len(data) <= self.max_inline else None,
+            "variants": {}
+        }
+
+    def resolve(self, source, folder):
+        key = (source, folder)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry["checked_at"] < self.recheck_seconds:
+                return entry["icon"]
+        previous = entry["icon"] if entry is not None else None
+
+        path, st = self._find(source, folder)
+        icon = None
+        if path is not None:
+            if (previous is not None and previous["path"] == path
+                    and previous["mtime"] == st.st_mtime_ns and previous["size"] == st.st_size):
+                icon = previous
+            else:
+                try:
+                    icon = self._load(path, st)
+                except OSError:
+                    icon = None
+        with self._lock:
+            self._entries[key] = {"checked_at": now, "icon": icon}
+        return icon
+
+    def url(self, source, folder):
+        icon = self.resolve(source, folder)
+        if icon is None:
+            return None
+        return f"/api/icons/{source}/{folder}?v={icon['digest']}"
+
+    def variant(self, icon, size=None, fmt=None):
+        # Returns (data, mimetype, etag); data is None when the original
+        # should be streamed from icon["path"]
+        if (size is None and fmt is None) or Image is None or icon["mimetype"] == "image/svg+xml":
+            return icon["data"], icon["mimetype"], icon["digest"]
+        key = (size, fmt)
+        cached = icon["variants"].get(key)
+        if cached is not None:
+            return cached
+
+        ext = fmt or os.path.splitext(icon["path"])[1].lstrip(".")
+        etag = f"{icon['digest']}-{size or 'full'}.{ext}"
+        path = os.path.join(self.variant_dir, etag)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            data = self._render(icon, size, ext)
+            if data is None:
+                return icon["data"], icon["mimetype"], icon["digest"]
+            os.makedirs(self.variant_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        result = (data, mimetypes.guess_type(path)[0] or icon["mimetype"], etag)
+        icon["variants"][key] = result
+        return result
+
+    def _render(self, icon, size, ext):
+        try:
+            source = icon["data"]
+            if source is None:
+                with open(icon["path"], "rb") as f:
+                    source = f.read()
+            image = Image.open(io.BytesIO(source))
+            if size is not None:
+                image.thumbnail((size, size), Image.LANCZOS)
+            if ext in ("jpg", "jpeg") and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            out = io.BytesIO()
+            image.save(out, format={"jpg": "JPEG"}.get(ext, ext.upper()))
+            return out.getvalue()
+        except Exception as e:
+            print(f"[Icons] Could not render {icon['path']} at {size} as {ext}: {e}")
+            return None
@@ -0,0 +1,223 @@
+import json
+import time
+import threading
+from collections import deque
+
+from sqlalchemy import select, insert, update, delete, func
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+
+class Channel:
+    # Bounded message queue for one receiver. Every message gets an
+    # increasing id; each subscriber reads from its own cursor, so several
+    # subscribers of the same receiver all see every message (fan-out).
+    def __init__(self, maxlen):
+        self.messages = deque(maxlen=maxlen)
+        # Start ids from the clock so cursors stay valid across restarts
+        self.last_id = int(time.time() * 1000)
+        self.cursors = {}
+        self.cond = threading.Condition()
+
+    def after(self, cursor, limit):
+        if not self.messages or self.messages[-1]["id"] <= cursor:
+            return []
+        result = []
+        for msg in self.messages:
+            if msg["id"] > cursor:
+                result.append(msg)
+                if len(result) >= limit:
+                    break
+        return result
+
+
+class MessageBus:
+    def __init__(self, queue_size=1000):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def channel(self, receiver):
+        with self._lock:
+            channel = self._channels.get(receiver)
+            if channel is None:
+                channel = self._channels[receiver] = Channel(self.queue_size)
+            return channel
+
+    def send(self, sender, receiver, message):
+        channel = self.channel(receiver)
+        with channel.cond:
+            channel.last_id += 1
+            msg = {
+                "id": channel.last_id,
+                "from": sender,
+                "message": message,
+                "timestamp": int(time.time())
+            }
+            channel.messages.append(msg)
+            channel.cond.notify_all()
+        return msg["id"]
+
+    def fetch(self, receiver, subscriber, cursor=None, wait=0, limit=100):
+        # With cursor=None the subscriber's stored cursor is used and advanced
+        # atomically (consume semantics, safe for racing pollers). With an
+        # explicit cursor nothing is advanced until ack() is called.
+        # Returns (messages, cursor).
+        channel = self.channel(receiver)
+        auto_ack = cursor is None
+        deadline = time.monotonic() + wait
+
+        with channel.cond:
+            while True:
+                start = channel.cursors.get(subscriber, 0) if auto_ack else cursor
+                msgs = channel.after(start, limit)
+                remaining = deadline - time.monotonic()
+                if msgs or remaining <= 0:
+                    break
+                channel.cond.wait(remaining)
+
+            new_cursor = msgs[-1]["id"] if msgs else start
+            if auto_ack and msgs:
+                channel.cursors[subscriber] = new_cursor
+            return msgs, new_cursor
+
+    def ack(self, receiver, subscriber, cursor):
+        channel = self.channel(receiver)
+        with channel.cond:
+            if cursor > channel.cursors.get(subscriber, 0):
+                channel.cursors[subscriber] = cursor
+
+    def cursor(self, receiver, subscriber):
+        channel = self.channel(receiver)
+        with channel.cond:
+            return channel.cursors.get(subscriber, 0)
+
+
+class DatabaseMessageBus:
+    # MessageBus backed by the BusMessage/BusCursor tables, for running
+    # several server worker processes: every worker sees the same queues
+    # and cursors. One watcher thread per process polls max(id) and wakes
+    # local waiters, so idle long-polls and SSE streams cost no queries.
+    def __init__(self, engine, messages, cursors, queue_size=1000, poll_interval=0.1):
+        self.engine = engine
+        self.messages = messages
+        self.cursors = cursors
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self._cond = threading.Condition()
+        self._last_id = self._max_id()
+        self._sends = 0
+        threading.Thread(target=self._watch, name="message-bus-watcher", daemon=True).start()
+
+    def _max_id(self):
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.max(self.messages.c.id))).scalar() or 0
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                last_id = self._max_id()
+            except SQLAlchemyError:
+                continue
+            with self._cond:
+                if last_id > self._last_id:
+                    self._last_id = last_id
+                    self._cond.notify_all()
+
+    def send(self, sender, receiver, message):
+        m = self.messages.c
+        with self.engine.begin() as conn:
+            msg_id = conn.execute(insert(self.messages).values(
+                receiver=receiver,
+                sender=sender,
+                message=json.dumps(message),
+                timestamp=int(time.time())
+            )).inserted_primary_key[0]
+            self._sends += 1
+            if self._sends % max(1, self.queue_size // 10) == 0:
+                # Trim the receiver's queue to about queue_size messages
+                cutoff = conn.execute(
+                    select(m.id).where(m.receiver == receiver)
+                    .order_by(m.id.desc()).offset(self.queue_size).limit(1)
+                ).scalar()
+                if cutoff is not None:
+                    conn.execute(delete(self.messages).where(m.receiver == receiver, m.id <= cutoff))
+        with self._cond:
+            if msg_id > self._last_id:
+                self._last_id = msg_id
+                self._cond.notify_all()
+        return msg_id
+
+    def _after(self, conn, receiver, cursor, limit):
+        m = self.messages.c
+        rows = conn.execute(
+            select(m.id, m.sender, m.message, m.timestamp)
+            .where(m.receiver == receiver, m.id > cursor)
+            .order_by(m.id).limit(limit)
+        )
+        return [
+            {"id": row.id, "from": row.sender, "message": json.loads(row.message), "timestamp": row.timestamp}
+            for row in rows
+        ]
+
+    def _stored_cursor(self, conn, receiver, subscriber):
+        c = self.cursors.c
+        return conn.execute(
+            select(c.cursor).where(c.receiver == receiver, c.subscriber == subscriber)
+        ).scalar()
+
+    def _advance(self, conn, receiver, subscriber, expected, new_cursor):
+        # Compare-and-set, so two workers polling for the same subscriber
+        # never both consume a message; returns False if we lost the race
+        c = self.cursors.c
+        if expected is None:
+            try:
+                with conn.begin_nested():
+                    conn.execute(insert(self.cursors).values(receiver=receiver, subscriber=subscriber, cursor=new_cursor))
+                return True
+            except IntegrityError:
+                return False
+        result = conn.execute(
+            update(self.cursors)
+            .where(c.receiver == receiver, c.subscriber == subscriber, c.cursor == expected)
+            .values(cursor=new_cursor)
+        )
+        return result.rowcount == 1
+
+    def fetch(self, receiver, subscriber, cursor=None, wait=0, limit=100):
+        # Same semantics as MessageBus.fetch; returns (messages, cursor)
+        auto_ack = cursor is None
+        deadline = time.monotonic() + wait
+        while True:
+            with self._cond:
+                seen = self._last_id
+            with self.engine.begin() as conn:
+                stored = self._stored_cursor(conn, receiver, subscriber) if auto_ack else None
+                start = (stored or 0) if auto_ack else cursor
+                msgs = self._after(conn, receiver, start, limit)
+                if msgs and auto_ack and not self._advance(conn, receiver, subscriber, stored, msgs[-1]["id"]):
+                    continue
+            remaining = deadline - time.monotonic()
+            if msgs or remaining <= 0:
+                return msgs, msgs[-1]["id"] if msgs else start
+            with self._cond:
+                if self._last_id == seen:
+                    self._cond.wait(remaining)
+
+    def ack(self, receiver, subscriber, cursor):
+        c = self.cursors.c
+        with self.engine.begin() as conn:
+            stored = self._stored_cursor(conn, receiver, subscriber)
+            if stored is None:
+                if not self._advance(conn, receiver, subscriber, None, cursor):
+                    stored = self._stored_cursor(conn, receiver, subscriber)
+            if stored is not None:
+                conn.execute(
+                    update(self.cursors)
+                    .where(c.receiver == receiver, c.subscriber == subscriber, c.cursor < cursor)
+                    .values(cursor=cursor)
+                )
+
+    def cursor(self, receiver, subscriber):
+        with self.engine.connect() as conn:
+            return self._stored_cursor(conn, receiver, subscriber) or 0
@@ -1,6 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from datetime import datetime
+from datetime import datetime, timezone
 
 db = SQLAlchemy()
 
@@ -18,7 +18,132 @@ class SocialAccount(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
 class Notification(db.Model):
+    __table_args__ = (
+        # Unread count / unread listing per user
+        db.Index('ix_notification_user_read_created', 'user_id', 'read', 'created_at'),
+        # Incremental fetch (?since_id=) per user
+        db.Index('ix_notification_user_id', 'user_id', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     message = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    read = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "message": self.message,
+            "timestamp": int(self.created_at.replace(tzinfo=timezone.utc).timestamp()),
+            "read": self.read
+        }
+
+
+class StoredFile(db.Model):
+    # Metadata index for the Files API; contents live in the blob store
+    __table_args__ = (
+        db.UniqueConstraint('app_name', 'filename', name='uq_stored_file_app_filename'),
+        db.Index('ix_stored_file_app_size', 'app_name', 'size', 'filename'),
+        db.Index('ix_stored_file_app_uploaded', 'app_name', 'uploaded_at', 'filename'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    app_name = db.Column(db.String(150), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    content_type = db.Column(db.String(255))
+    uploaded_at = db.Column(db.Integer, nullable=False)
+
+    def to_dict(self):
+        return {
+            "filename": self.filename,
+            "size": self.size,
+            "sha256": self.sha256,
+            "content_type": self.content_type,
+            "uploaded_at": self.uploaded_at
+        }
+
+
+class AppSetting(db.Model):
+    # One JSON settings document per app
+    app_name = db.Column(db.String(150), primary_key=True)
+    data = db.Column(db.Text, nullable=False, default="{}")
+    updated_at = db.Column(db.Integer, nullable=False)
+    # Bumped on every change; the ETag / If-Match value of the document
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class RegistryApp(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(150), unique=True, nullable=False)
+    description = db.Column(db.String(255), nullable=False, default="")
+    icon = db.Column(db.String(255), nullable=False, default="")
+    launch_url = db.Column(db.String(255), nullable=False, default="")
+    source = db.Column(db.String(150), nullable=False)
+    category = db.Column(db.String(150))
+    folder = db.Column(db.String(150), nullable=False)
+
+    def to_dict(self):
+        entry = {
+            "name": self.name,
+            "description": self.description,
+            "icon": self.icon,
+            "launchUrl": self.launch_url,
+            "source": self.source,
+            "folder": self.folder
+        }
+        if self.category is not None:
+            entry["category"] = self.category
+        return entry
+
+
+class BusMessage(db.Model):
+    # Plugin message bus queues when several server workers share them
+    __table_args__ = (
+        db.Index('ix_bus_message_receiver_id', 'receiver', 'id'),
+        # Never reuse ids: subscriber cursors rely on them only growing
+        {"sqlite_autoincrement": True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    receiver = db.Column(db.String(150), nullable=False)
+    sender = db.Column(db.String(150))
+    message = db.Column(db.Text, nullable=False)
+    timestamp = db.Column(db.Integer, nullable=False)
+
+
+class BusCursor(db.Model):
+    receiver = db.Column(db.String(150), primary_key=True)
+    subscriber = db.Column(db.String(150), primary_key=True)
+    cursor = db.Column(db.Integer, nullable=False, default=0)
+
+
+def upgrade_schema(default_registry=()):
+    # create_all() only creates missing tables; bring older databases up to
+    # date with the columns and indexes added since
+    inspector = db.inspect(db.engine)
+    seed_registry = not inspector.has_table(RegistryApp.__tablename__)
+    db.create_all()
+    if seed_registry:
+        db.session.add_all(RegistryApp(
+            name=entry["name"],
+            description=entry.get("description", ""),
+            icon=entry.get("icon", ""),
+            launch_url=entry.get("launchUrl", ""),
+            source=entry["source"],
+            category=entry.get("category"),
+            folder=entry["folder"]
+        ) for entry in default_registry)
+        db.session.commit()
+    inspector = db.inspect(db.engine)
+    columns = {c["name"] for c in inspector.get_columns("notification")}
+    setting_columns = {c["name"] for c in inspector.get_columns("app_setting")}
+    with db.engine.begin() as conn:
+        if "read" not in columns:
+            conn.execute(db.text("ALTER TABLE notification ADD COLUMN read BOOLEAN NOT NULL DEFAULT 0"))
+        if "version" not in setting_columns:
+            conn.execute(db.text("ALTER TABLE app_setting ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+        for index in Notification.__table__.indexes:
+            index.create(conn, checkfirst=True)
@@ -0,0 +1,63 @@
+# Production server for the backend: `python serve.py` instead of `python app.py`.
+#
+#   SERVER_WORKERS   worker processes (gunicorn, POSIX only; default: CPU count)
+#   SERVER_THREADS   threads per worker (default 8)
+#   SERVER_HOST / SERVER_PORT, SERVER_GRACEFUL_TIMEOUT, SERVER_PIDFILE
+#
+# With gunicorn, `kill -HUP <master pid>` reloads gracefully: new workers
+# start with the new code and old ones finish their requests first. Without
+# gunicorn (e.g. on Windows) it falls back to waitress, then to Werkzeug's
+# threaded server, both single-process.
+import os
+import importlib.util
+import multiprocessing
+
+HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+PORT = int(os.getenv("SERVER_PORT", "5000"))
+WORKERS = int(os.getenv("SERVER_WORKERS", str(multiprocessing.cpu_count())))
+THREADS = int(os.getenv("SERVER_THREADS", "8"))
+GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+
+
+def serve_gunicorn():
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{HOST}:{PORT}")
+            self.cfg.set("workers", WORKERS)
+            self.cfg.set("threads", THREADS)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("graceful_timeout", GRACEFUL_TIMEOUT)
+            # Each worker imports the app itself: its background threads
+            # (write buffers, message bus watcher) would not survive a fork
+            self.cfg.set("preload_app", False)
+            if os.getenv("SERVER_PIDFILE"):
+                self.cfg.set("pidfile", os.getenv("SERVER_PIDFILE"))
+
+        def load(self):
+            from app import app
+            return app
+
+    if WORKERS > 1:
+        # In-memory queues would be per worker
+        os.environ.setdefault("MESSAGE_BUS", "database")
+    Server().run()
+
+
+def serve_threaded():
+    from app import app
+    try:
+        from waitress import serve
+    except ImportError:
+        print("[serve] gunicorn and waitress not installed, using Werkzeug's threaded server")
+        app.run(host=HOST, port=PORT, threaded=True, debug=False, use_reloader=False)
+        return
+    serve(app, host=HOST, port=PORT, threads=THREADS)
+
+
+if __name__ == "__main__":
+    if os.name != "nt" and importlib.util.find_spec("gunicorn"):
+        serve_gunicorn()
+    else:
+        serve_threaded()
@@ -0,0 +1,330 @@
+import copy
+import json
+import time
+import threading
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, AppSetting
+from batching import WriteBuffer
+
+
+class SettingsError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _pointer(path):
+    # RFC 6901 JSON pointer -> list of reference tokens
+    if path == "":
+        return []
+    if not isinstance(path, str) or not path.startswith("/"):
+        raise SettingsError(f"Invalid JSON pointer: {path!r}")
+    return [t.replace("~1", "/").replace("~0", "~") for t in path[1:].split("/")]
+
+
+def _index(container, token, allow_end=False):
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise SettingsError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise SettingsError(f"Array index out of range: {token}")
+    return index
+
+
+def _parent(doc, tokens):
+    node = doc
+    for token in tokens[:-1]:
+        if isinstance(node, dict) and token in node:
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_index(node, token)]
+        else:
+            raise SettingsError(f"Path not found: /{'/'.join(tokens)}", 409)
+    return node
+
+
+def _get(doc, tokens):
+    if not tokens:
+        return doc
+    parent, token = _parent(doc, tokens), tokens[-1]
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise SettingsError(f"Path not found: /{'/'.join(tokens)}", 409)
+        return parent[token]
+    if isinstance(parent, list):
+        return parent[_index(parent, token)]
+    raise SettingsError(f"Path not found: /{'/'.join(tokens)}", 409)
+
+
+def _add(doc, tokens, value):
+    if not tokens:
+        return value
+    parent, token = _parent(doc, tokens), tokens[-1]
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, token, allow_end=True), value)
+    else:
+        raise SettingsError(f"Path not found: /{'/'.join(tokens)}", 409)
+    return doc
+
+
+def _remove(doc, tokens):
+    if not tokens:
+        raise SettingsError("Cannot remove the whole document")
+    value = _get(doc, tokens)
+    parent, token = _parent(doc, tokens), tokens[-1]
+    if isinstance(parent, dict):
+        del parent[token]
+    else:
+        del parent[_index(parent, token)]
+    return value
+
+
+def key_pointer(key):
+    # "a/b" (URL form) -> "/a/b"
+    return "/" + "/".join(t.replace("~", "~0") for t in key.split("/"))
+
+
+def get_path(doc, pointer):
+    return _get(doc, _pointer(pointer))
+
+
+def apply_json_patch(doc, ops):
+    # RFC 6902; works on a copy and returns it
+    if not isinstance(ops, list):
+        raise SettingsError("A JSON patch must be a list of operations")
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        if not isinstance(op, dict) or "op" not in op or "path" not in op:
+            raise SettingsError("Every patch operation needs op and path")
+        tokens = _pointer(op["path"])
+        kind = op["op"]
+        if kind in ("add", "replace", "test") and "value" not in op:
+            raise SettingsError(f"{kind} needs a value")
+        if kind == "add":
+            doc = _add(doc, tokens, copy.deepcopy(op["value"]))
+        elif kind == "remove":
+            _remove(doc, tokens)
+        elif kind == "replace":
+            if tokens:
+                _remove(doc, tokens)
+            doc = _add(doc, tokens, copy.deepcopy(op["value"]))
+        elif kind in ("move", "copy"):
+            source = _pointer(op.get("from"))
+            if kind == "move":
+                if tokens[:len(source)] == source and tokens != source:
+                    raise SettingsError("Cannot move a value into itself")
+                value = _remove(doc, source)
+            else:
+                value = copy.deepcopy(_get(doc, source))
+            doc = _add(doc, tokens, value)
+        elif kind == "test":
+            if _get(doc, tokens) != op["value"]:
+                raise SettingsError(f"Test failed at {op['path']}", 409)
+        else:
+            raise SettingsError(f"Unknown patch operation: {kind!r}")
+    return doc
+
+
+def apply_merge_patch(doc, patch):
+    # RFC 7396: objects merge recursively, null deletes a key
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(doc) if isinstance(doc, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+
+def apply_change(doc, change):
+    kind, payload = change
+    if kind == "replace":
+        result = copy.deepcopy(payload)
+    elif kind == "merge":
+        result = apply_merge_patch(doc, payload)
+    else:
+        result = apply_json_patch(doc, payload)
+    if not isinstance(result, dict):
+        raise SettingsError("Settings must be a JSON object")
+    return result
+
+
+class SettingsStore:
+    # Per-app settings documents in the AppSetting table with a
+    # read-through cache. Writes go through a WriteBuffer: a write without
+    # If-Match is checked against the current document and queued, so a
+    # burst of changes within write_delay becomes one transaction; a write
+    # with If-Match is saved at once (after anything queued before it) and
+    # returns only once it is in the database. Each save is a
+    # compare-and-swap on the stored version; when another worker got there
+    # first the batch is re-applied (and If-Match re-checked) on the newer
+    # row. Reads wait for queued changes to the same app, and cached entries
+    # are re-read after cache_ttl so changes made by other workers show up.
+    def __init__(self, app, cache_ttl=2.0, write_delay=0.5):
+        self.app = app
+        self.cache_ttl = cache_ttl
+        self._lock = threading.Lock()
+        self._entries = {}   # app_name -> {"data", "version", "loaded_at"}
+        self._queued = {}    # app_name -> {"data": document with queued changes, "count"}
+        self._buffer = WriteBuffer(self._flush, max_delay=write_delay, name="settings-writer")
+
+    def _load(self, app_name):
+        # Own connection, so the caller's session is left alone
+        table = AppSetting.__table__
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                db.select(table.c.data, table.c.version).where(table.c.app_name == app_name)
+            ).first()
+        if row is None:
+            return {}, 0
+        return json.loads(row.data), row.version
+
+    def _store(self, app_name, data, version):
+        with self._lock:
+            entry = self._entries.get(app_name)
+            # Never replace a newer document with an older one
+            if entry is None or entry["version"] <= version:
+                self._entries[app_name] = {"data": data, "version": version, "loaded_at": time.monotonic()}
+
+    def _item(self, app_name, change, if_match=None, queued=False):
+        return {"app_name": app_name, "change": change, "if_match": if_match, "queued": queued,
+                "result": None, "error": None}
+
+    def get(self, app_name):
+        with self._lock:
+            queued = app_name in self._queued
+        if queued:
+            # Read your writes: save what is queued for this app first
+            self._buffer.submit([self._item(app_name, None)], urgent=True)
+        with self._lock:
+            entry = self._entries.get(app_name)
+            if entry is not None and time.monotonic() - entry["loaded_at"] < self.cache_ttl:
+                return entry["data"], entry["version"]
+        data, version = self._load(app_name)
+        self._store(app_name, data, version)
+        return data, version
+
+    def update(self, app_name, change, if_match=None):
+        # change is ("replace", doc), ("merge", patch) or ("json-patch", ops);
+        # if_match(data, version) -> bool rejects the write with 412 when False.
+        # Returns the saved (data, version), or None when the change was queued.
+        if if_match is None:
+            with self._lock:
+                queued = self._queued.get(app_name)
+                base = queued["data"] if queued is not None else None
+            if base is None:
+                base = self.get(app_name)[0]
+            # Raises now for changes that do not apply
+            data = apply_change(base, change)
+            with self._lock:
+                queued = self._queued.setdefault(app_name, {"data": None, "count": 0})
+                queued["data"] = data
+                queued["count"] += 1
+            self._buffer.submit([self._item(app_name, change, queued=True)], wait=False)
+            return None
+        item = self._item(app_name, change, if_match)
+        self._buffer.submit([item], urgent=True)
+        if item["error"] is not None:
+            raise item["error"]
+        return item["result"]
+
+    def _flush(self, items):
+        by_app = {}
+        for item in items:
+            by_app.setdefault(item["app_name"], []).append(item)
+        with self.app.app_context():
+            for app_name, app_items in by_app.items():
+                try:
+                    self._save(app_name, app_items)
+                except Exception as e:
+                    print(f"[settings-writer] Could not save settings for {app_name}: {e}")
+                    for item in app_items:
+                        item["error"] = SettingsError("Could not save settings", 503)
+                finally:
+                    self._dequeue(app_name, app_items)
+
+    def _dequeue(self, app_name, items):
+        count = 0
+        for item in items:
+            if item["queued"]:
+                count += 1
+                if item["error"] is not None:
+                    # The client already got its 202
+                    print(f"[settings-writer] Dropped a queued change to {app_name}: {item['error']}")
+        if not count:
+            return
+        with self._lock:
+            queued = self._queued.get(app_name)
+            if queued is not None:
+                queued["count"] -= count
+                if queued["count"] <= 0:
+                    del self._queued[app_name]
+
+    def _apply(self, data, version, items):
+        # Applies every change that passes its If-Match to data in order;
+        # the others get their error
+        for item in items:
+            item["result"] = item["error"] = None
+            if item["change"] is None:
+                continue
+            try:
+                if item["if_match"] is not None and not item["if_match"](data, version):
+                    raise SettingsError("Settings were changed since they were read", 412)
+                data = apply_change(data, item["change"])
+            except SettingsError as e:
+                item["error"] = e
+                continue
+            version += 1
+            item["result"] = (data, version)
+        return data, version
+    def _save(self, app_name, items):
+        # Compare-and-swap on the stored version; starts from the cached
+        # document and falls back to the database row on a conflict or
+        # when a change was rejected against the cached copy
+        table = AppSetting.__table__
+        with self._lock:
+            entry = self._entries.get(app_name)
+        if entry is not None:
+            base, saved_version, fresh = entry["data"], entry["version"], False
+        else:
+            (base, saved_version), fresh = self._load(app_name), True
+        for _ in range(10):
+            data, version = self._apply(base, saved_version, items)
+            if not fresh and any(item["error"] is not None for item in items):
+                (base, saved_version), fresh = self._load(app_name), True
+                continue
+            if version == saved_version:
+                return
+            values = {"data": json.dumps(data), "version": version, "updated_at": int(time.time())}
+            saved = False
+            try:
+                with db.engine.begin() as conn:
+                    result = conn.execute(
+                        table.update()
+                        .where(table.c.app_name == app_name, table.c.version == saved_version)
+                        .values(**values)
+                    )
+                    if result.rowcount:
+                        saved = True
+                    elif saved_version == 0:
+                        # No row yet; fails if another worker just created one
+                        conn.execute(table.insert().values(app_name=app_name, **values))
+                        saved = True
+            except IntegrityError:
+                pass
+            if saved:
+                self._store(app_name, data, version)
+                return
+            (base, saved_version), fresh = self._load(app_name), True
+        raise RuntimeError(f"Could not save settings for {app_name}: too many conflicting writes")
+
+    def close(self):
+        self._buffer.close()
@@ -0,0 +1,342 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import secrets
+import tempfile
+import threading
+
+from filelock import FileLock
+
+
+class BlobStore:
+    # Content-addressed blob store: each blob lives at <root>/blobs/<aa>/<sha256>
+    # and is written once. Uploads are streamed through a temp file in fixed
+    # size chunks, so memory use does not depend on the size of the upload.
+    def __init__(self, root, chunk_size=1024 * 1024):
+        self.root = os.path.abspath(root)
+        self.chunk_size = chunk_size
+        self.blob_dir = os.path.join(self.root, "blobs")
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        # Held by callers around "add/remove a reference" + blob changes so a
+        # blob is never removed while a new reference to it is being created,
+        # also across server worker processes
+        self.lock = FileLock(os.path.join(self.root, "blobs.lock"))
+
+    def path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def exists(self, digest):
+        return os.path.isfile(self.path(digest))
+
+    def put_stream(self, stream, on_commit=None):
+        # Returns (sha256 hex digest, size in bytes). on_commit(digest, size)
+        # runs under the store lock once the blob is in place.
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            digest = hasher.hexdigest()
+            self.commit_file(tmp_path, digest, on_commit and (lambda: on_commit(digest, size)))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return digest, size
+
+    def commit_file(self, tmp_path, digest, on_commit=None):
+        # Moves an already-hashed file into place; identical content is stored
+        # once. If on_commit fails it cleans up after itself (see register_file).
+        target = self.path(digest)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with self.lock:
+            if os.path.exists(target):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, target)
+            if on_commit:
+                on_commit()
+
+    def remove(self, digest):
+        with self.lock:
+            try:
+                os.remove(self.path(digest))
+            except FileNotFoundError:
+                pass
+
+
+def valid_filename(name):
+    # Stored files are addressed as /api/files/<app_name>/<filename>
+    return isinstance(name, str) and name not in ("", ".", "..") and "/" not in name and "\0" not in name
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class ChunkedUploads:
+    # Resumable uploads: initiate, PUT chunk N at its offset, then commit.
+    # Chunks are written straight to their offset in one preallocated file,
+    # so there is no assembly step, and chunks may arrive in parallel and in
+    # any order. Each chunk is verified before it is written, and chunks that
+    # arrive in order are fed to the SHA-256 hasher from that buffer, so
+    # commit usually does not re-read the file.
+    STATE_FILE = "state.json"
+
+    def __init__(self, blob_store, max_chunk_size=64 * 1024 * 1024, max_size=16 * 1024 ** 3, ttl_seconds=24 * 3600):
+        self.blob_store = blob_store
+        self.max_chunk_size = max_chunk_size
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.upload_dir = os.path.join(blob_store.root, "uploads")
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def _dir(self, upload_id):
+        return os.path.join(self.upload_dir, upload_id)
+
+    def _save_state(self, session):
+        state = {k: v for k, v in session.items() if k not in ("lock", "hasher", "hashed")}
+        state["received"] = sorted(session["received"])
+        tmp = os.path.join(self._dir(session["upload_id"]), self.STATE_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, os.path.join(self._dir(session["upload_id"]), self.STATE_FILE))
+
+    def _load(self, upload_id):
+        # Sessions survive a backend restart; only the running hash is lost
+        if not upload_id.isalnum():
+            return None
+        state_path = os.path.join(self._dir(upload_id), self.STATE_FILE)
+        try:
+            with open(state_path) as f:
+                session = json.load(f)
+        except (OSError, ValueError):
+            return None
+        session["received"] = set(session["received"])
+        session["lock"] = FileLock(os.path.join(self._dir(upload_id), "lock"))
+        session["hasher"] = None
+        session["hashed"] = 0
+        return session
+
+    def _refresh(self, session):
+        # Called with the session lock held: pick up chunks that other worker
+        # processes received since this one last looked
+        try:
+            with open(os.path.join(self._dir(session["upload_id"]), self.STATE_FILE)) as f:
+                received = json.load(f)["received"]
+        except (OSError, ValueError, KeyError):
+            raise UploadError("Upload not found", 404)
+        session["received"].update(received)
+
+    def get(self, upload_id, app_name=None):
+        with self._lock:
+            session = self._sessions.get(upload_id)
+            if session is not None and not os.path.isdir(self._dir(upload_id)):
+                # Committed or aborted by another worker
+                del self._sessions[upload_id]
+                session = None
+            if session is None:
+                session = self._load(upload_id)
+                if session is not None:
+                    self._sessions[upload_id] = session
+        if session is None or (app_name is not None and session["app_name"] != app_name):
+            raise UploadError("Upload not found", 404)
+        return session
+
+    def create(self, app_name, filename, size, chunk_size=None, content_type=None, sha256=None):
+        if not valid_filename(filename):
+            raise UploadError("Invalid filename")
+        try:
+            chunk_size = int(chunk_size or self.blob_store.chunk_size * 8)
+            size = int(size)
+        except (TypeError, ValueError):
+            raise UploadError("Invalid size or chunk_size")
+        if size < 0 or chunk_size <= 0 or chunk_size > self.max_chunk_size:
+            raise UploadError("Invalid size or chunk_size")
+        if size > self.max_size:
+            raise UploadError(f"Uploads are limited to {self.max_size} bytes", 413)
+
+        self.expire()
+        upload_id = secrets.token_hex(16)
+        try:
+            os.makedirs(self._dir(upload_id))
+            with open(os.path.join(self._dir(upload_id), "data"), "wb") as f:
+                f.truncate(size)
+        except OSError as e:
+            shutil.rmtree(self._dir(upload_id), ignore_errors=True)
+            print(f"[Uploads] Could not create upload of {size} bytes: {e}")
+            raise UploadError("Not enough storage for this upload", 507)
+
+        session = {
+            "upload_id": upload_id,
+            "app_name": app_name,
+            "filename": filename,
+            "size": size,
+            "chunk_size": chunk_size,
+            "chunks": max(1, -(-size // chunk_size)),
+            "content_type": content_type,
+            "sha256": sha256,
+            "created_at": int(time.time()),
+            "received": set(),
+            "lock": FileLock(os.path.join(self._dir(upload_id), "lock")),
+            "hasher": hashlib.sha256(),
+            "hashed": 0
+        }
+        self._save_state(session)
+        with self._lock:
+            self._sessions[upload_id] = session
+        return session
+
+    def _chunk_length(self, session, index):
+        start = index * session["chunk_size"]
+        return min(session["chunk_size"], session["size"] - start)
+
+    def _advance_hash(self, session, index, data):
+        # Called with the session lock held; `data` is the chunk just written
+        if session["hasher"] is None:
+            return
+        if index == session["hashed"]:
+            data.seek(0)
+            for block in iter(lambda: data.read(self.blob_store.chunk_size), b""):
+                session["hasher"].update(block)
+            session["hashed"] += 1
+        # Catch up over chunks that arrived early; these are read back once
+        data_path = os.path.join(self._dir(session["upload_id"]), "data")
+        while session["hashed"] in session["received"] and session["hashed"] < session["chunks"]:
+            self._hash_range(session, data_path, session["hashed"], session["hasher"])
+            session["hashed"] += 1
+
+    def _hash_range(self, session, data_path, index, hasher):
+        remaining = self._chunk_length(session, index)
+        with open(data_path, "rb") as f:
+            f.seek(index * session["chunk_size"])
+            while remaining > 0:
+                block = f.read(min(self.blob_store.chunk_size, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+        return hasher
+
+    def write_chunk(self, upload_id, app_name, index, offset, stream, chunk_sha256=None):
+        session = self.get(upload_id, app_name)
+        if index < 0 or index >= session["chunks"]:
+            raise UploadError("Chunk index out of range")
+        if offset is not None and offset != index * session["chunk_size"]:
+            raise UploadError("Chunk offset does not match index")
+        expected = self._chunk_length(session, index)
+        data_path = os.path.join(self._dir(upload_id), "data")
+
+        # The chunk is buffered and verified before it touches the data file,
+        # so a short, corrupt or repeated chunk cannot overwrite accepted bytes
+        with tempfile.SpooledTemporaryFile(max_size=self.blob_store.chunk_size * 4) as buf:
+            hasher = hashlib.sha256()
+            written = 0
+            while written <= expected:
+                block = stream.read(self.blob_store.chunk_size)
+                if not block:
+                    break
+                written += len(block)
+                if written > expected:
+                    break
+                hasher.update(block)
+                buf.write(block)
+
+            if written != expected:
+                raise UploadError(f"Chunk {index} must be {expected} bytes")
+            digest = hasher.hexdigest()
+            if chunk_sha256 and chunk_sha256.lower() != digest:
+                raise UploadError(f"Chunk {index} hash mismatch", 422)
+
+            with session["lock"]:
+                self._refresh(session)
+                if index in session["received"]:
+                    # A retry is fine as long as it carries the same bytes
+                    if self._hash_range(session, data_path, index, hashlib.sha256()).hexdigest() != digest:
+                        raise UploadError(f"Chunk {index} was already received with different content", 409)
+                else:
+                    try:
+                        f = open(data_path, "r+b")
+                    except FileNotFoundError:
+                        raise UploadError("Upload not found", 404)
+                    with f:
+                        f.seek(index * session["chunk_size"])
+                        buf.seek(0)
+                        shutil.copyfileobj(buf, f, self.blob_store.chunk_size)
+                    session["received"].add(index)
+                    self._advance_hash(session, index, buf)
+                self._save_state(session)
+        return {"index": index, "sha256": digest, "received": len(session["received"]), "chunks": session["chunks"]}
+
+    def missing(self, session):
+        return [i for i in range(session["chunks"]) if i not in session["received"]]
+
+    def commit(self, upload_id, app_name, on_commit=None):
+        # on_commit(digest, session) runs under the blob store lock
+        session = self.get(upload_id, app_name)
+        with session["lock"]:
+            self._refresh(session)
+            if session["size"] == 0:
+                session["received"].add(0)
+            missing = self.missing(session)
+            if missing:
+                raise UploadError(f"Missing {len(missing)} chunk(s)", 409)
+
+            data_path = os.path.join(self._dir(upload_id), "data")
+            if session["hasher"] is None:
+                session["hasher"] = hashlib.sha256()
+                session["hashed"] = 0
+            while session["hashed"] < session["chunks"]:
+                if session["size"]:
+                    self._hash_range(session, data_path, session["hashed"], session["hasher"])
+                session["hashed"] += 1
+            digest = session["hasher"].hexdigest()
+            if session["sha256"] and session["sha256"].lower() != digest:
+                raise UploadError("File hash mismatch", 422)
+
+            try:
+                self.blob_store.commit_file(data_path, digest, on_commit and (lambda: on_commit(digest, session)))
+            except Exception as e:
+                print(f"[Uploads] Could not commit upload {upload_id}: {e}")
+                # Once the data file has been moved the session cannot be retried
+                if not os.path.exists(data_path):
+                    self._discard(upload_id)
+                raise UploadError("Could not store the uploaded file", 500)
+            self._discard(upload_id)
+        return digest, session
+
+    def _discard(self, upload_id):
+        with self._lock:
+            session = self._sessions.pop(upload_id, None)
+        shutil.rmtree(self._dir(upload_id), ignore_errors=True)
+        if session is not None:
+            session["lock"].close()
+
+    def abort(self, upload_id, app_name):
+        self.get(upload_id, app_name)
+        self._discard(upload_id)
+
+    def expire(self):
+        # Drops sessions that have not been committed within ttl_seconds
+        cutoff = time.time() - self.ttl_seconds
+        for upload_id in os.listdir(self.upload_dir):
+            try:
+                if os.stat(os.path.join(self._dir(upload_id), self.STATE_FILE)).st_mtime < cutoff:
+                    self._discard(upload_id)
+            except OSError:
+                continue
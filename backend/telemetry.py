@@ -0,0 +1,251 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+from flask import Response, g, has_request_context, request
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Registry:
+    # Minimal Prometheus registry: counters, histograms and callback gauges,
+    # rendered in the text exposition format. Values are per process; with
+    # several server workers every scrape sees the worker that answered it.
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _metric(self, kind, name, help_text, labels, buckets=None):
+        name = f"{self.prefix}_{name}"
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = {
+                    "kind": kind, "help": help_text, "labels": tuple(labels),
+                    "buckets": buckets, "values": {}, "callback": None
+                }
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        self._metric("counter", name, help_text, labels)
+        return f"{self.prefix}_{name}"
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self._metric("histogram", name, help_text, labels, buckets)
+        return f"{self.prefix}_{name}"
+
+    def gauge(self, name, help_text, callback):
+        self._metric("gauge", name, help_text, ())["callback"] = callback
+
+    def inc(self, name, labels=(), value=1):
+        with self._lock:
+            values = self._metrics[name]["values"]
+            values[labels] = values.get(labels, 0) + value
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            metric = self._metrics[name]
+            state = metric["values"].get(labels)
+            if state is None:
+                state = metric["values"][labels] = [[0] * len(metric["buckets"]), 0.0, 0]
+            for i, bound in enumerate(metric["buckets"]):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = [(name, dict(m, values=dict(m["values"]))) for name, m in sorted(self._metrics.items())]
+        for name, m in metrics:
+            lines.append(f"# HELP {name} {m['help']}")
+            lines.append(f"# TYPE {name} {m['kind']}")
+            if m["kind"] == "gauge":
+                try:
+                    lines.append(f"{name} {float(m['callback']())}")
+                except Exception:
+                    pass
+            elif m["kind"] == "counter":
+                for values, count in sorted(m["values"].items()):
+                    lines.append(f"{name}{_labels(m['labels'], values)} {count}")
+            else:
+                for values, (buckets, total, count) in sorted(m["values"].items()):
+                    cumulative = 0
+                    for bound, n in zip(m["buckets"], buckets):
+                        cumulative += n
+                        lines.append(f"{name}_bucket{_labels(m['labels'], values, ('le', bound))} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(m['labels'], values, ('le', '+Inf'))} {count}")
+                    lines.append(f"{name}_sum{_labels(m['labels'], values)} {total}")
+                    lines.append(f"{name}_count{_labels(m['labels'], values)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+class TimedLock:
+    # Wraps a lock (threading.Lock, FileLock, ...) and records how long
+    # callers waited to acquire it
+    def __init__(self, registry, metric, name, lock=None):
+        self._lock = lock or threading.Lock()
+        self._registry = registry
+        self._metric = metric
+        self._labels = (name,)
+
+    def acquire(self, *args):
+        start = time.perf_counter()
+        acquired = self._lock.acquire(*args)
+        self._registry.observe(self._metric, self._labels, time.perf_counter() - start)
+        return acquired
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class SlowRequestProfiler:
+    # Samples the stacks of threads serving requests every `interval`
+    # seconds; requests slower than `threshold` get their samples written to
+    # profile_dir as folded stacks (one "frame;frame;frame count" line per
+    # stack), ready for flamegraph.pl or speedscope.
+    def __init__(self, profile_dir, threshold, interval=0.005):
+        self.profile_dir = profile_dir
+        self.threshold = threshold
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        os.makedirs(profile_dir, exist_ok=True)
+        threading.Thread(target=self._sample, name="slow-request-profiler", daemon=True).start()
+
+    def start(self):
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+
+    def _sample(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for ident, stacks in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is None or ident == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                        frame = frame.f_back
+                    stacks[";".join(reversed(stack))] += 1
+
+    def finish(self, label, duration):
+        with self._lock:
+            stacks = self._active.pop(threading.get_ident(), None)
+        if not stacks or duration < self.threshold:
+            return None
+        safe = "".join(c if c.isalnum() else "_" for c in label).strip("_")[:80]
+        path = os.path.join(self.profile_dir, f"{int(time.time() * 1000)}-{int(duration * 1000)}ms-{safe}.folded")
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+class Telemetry:
+    # Request metrics for a Flask app plus a /metrics endpoint:
+    # counts by endpoint/method/status, latency and response size
+    # histograms, and (after instrument_engine) SQL query counts and time.
+    def __init__(self, app, prefix, profile_dir=None, slow_request_seconds=0, sample_interval=0.005):
+        self.registry = Registry(prefix)
+        r = self.registry
+        self.requests = r.counter("http_requests_total", "Requests handled", ("endpoint", "method", "status"))
+        self.latency = r.histogram("http_request_duration_seconds", "Time to produce the response", ("endpoint", "method"))
+        self.sizes = r.histogram("http_response_size_bytes", "Response body size, when known", ("endpoint",), SIZE_BUCKETS)
+        self.profiler = None
+        if slow_request_seconds and profile_dir:
+            self.profiler = SlowRequestProfiler(profile_dir, slow_request_seconds, sample_interval)
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.add_url_rule("/metrics", "prometheus_metrics", self.metrics_view)
+
+    def _before(self):
+        g.telemetry_start = time.perf_counter()
+        g.db_queries = 0
+        if self.profiler is not None:
+            self.profiler.start()
+
+    def _after(self, response):
+        start = g.get("telemetry_start")
+        if start is None:
+            return response
+        duration = time.perf_counter() - start
+        endpoint = request.url_rule.rule if request.url_rule else "<unmatched>"
+        r = self.registry
+        r.inc(self.requests, (endpoint, request.method, str(response.status_code)))
+        r.observe(self.latency, (endpoint, request.method), duration)
+        if response.content_length is not None:
+            r.observe(self.sizes, (endpoint,), response.content_length)
+        if hasattr(self, "db_per_request"):
+            r.observe(self.db_per_request, (endpoint,), g.db_queries)
+        if self.profiler is not None:
+            path = self.profiler.finish(f"{request.method} {endpoint}", duration)
+            if path:
+                print(f"[Telemetry] Slow request {request.method} {request.path} took {duration:.3f}s, stacks in {path}")
+        return response
+
+    def instrument_engine(self, engine):
+        # SQL statements executed through `engine`, overall and per request
+        from sqlalchemy import event
+
+        r = self.registry
+        self.db_queries = r.counter("db_queries_total", "SQL statements executed")
+        self.db_time = r.histogram("db_query_duration_seconds", "SQL statement execution time")
+        self.db_per_request = r.histogram("db_queries_per_request", "SQL statements per request", ("endpoint",), COUNT_BUCKETS)
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["query_start"].pop()
+            r.inc(self.db_queries)
+            r.observe(self.db_time, (), elapsed)
+            if has_request_context():
+                g.db_queries = g.get("db_queries", 0) + 1
+
+    def timed_lock(self, name, lock=None):
+        if not hasattr(self, "lock_wait"):
+            self.lock_wait = self.registry.histogram("lock_wait_seconds", "Time spent waiting to acquire a lock", ("lock",))
+        return TimedLock(self.registry, self.lock_wait, name, lock)
+
+    def gauge(self, name, help_text, callback):
+        self.registry.gauge(name, help_text, callback)
+
+    def metrics_view(self):
+        return Response(self.registry.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,392 @@
+# Offline benchmarks for the backend and supervisor APIs.
+#
+#   python bench/run.py                        all scenarios, in-process (Flask test client)
+#   python bench/run.py --http                 same, over localhost through threaded servers
+#   python bench/run.py -c 16 -n 1000 --apps 500 --files 2000 --logs 200000
+#   python bench/run.py --only files.list,messages.fetch
+#   python bench/run.py --save bench/baseline.json
+#   python bench/run.py --compare bench/baseline.json --threshold 0.2
+#
+# Everything runs against a throwaway workspace (database, file storage,
+# event log and an apps/ tree of stub apps), so the real instance is never
+# touched and no network access is needed. --compare exits with status 1 if
+# a scenario's p95 latency or throughput regressed by more than --threshold.
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import socket
+import queue
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+STUB_START = """import os
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+ThreadingHTTPServer(("127.0.0.1", int(os.environ["PORT"])), Handler).serve_forever()
+"""
+
+# 1x1 transparent PNG
+STUB_ICON = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000005000100c4a5e2ff0000000049454e44ae426082"
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="ApolloSuite API benchmarks")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("-n", "--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--apps", type=int, default=100, help="stub apps in the catalog")
+    parser.add_argument("--files", type=int, default=500, help="files stored before the files.* scenarios")
+    parser.add_argument("--file-size", type=int, default=64 * 1024, help="bytes per uploaded file")
+    parser.add_argument("--logs", type=int, default=20000, help="log entries before the logs.* scenarios")
+    parser.add_argument("--launches", type=int, default=10, help="requests for supervisor.launch")
+    parser.add_argument("--http", action="store_true", help="go through localhost HTTP servers")
+    parser.add_argument("--only", help="comma-separated scenario names or prefixes")
+    parser.add_argument("--save", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed regression (0.2 = 20%%)")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary workspace")
+    return parser.parse_args()
+
+
+def make_workspace(args):
+    workspace = tempfile.mkdtemp(prefix="apollo-bench-")
+    apps_dir = os.path.join(workspace, "apps")
+    for i in range(args.apps):
+        folder = os.path.join(apps_dir, "Bench", f"app{i:04d}")
+        os.makedirs(os.path.join(folder, "icons"))
+        with open(os.path.join(folder, "config.ini"), "w") as f:
+            f.write(f"[App]\nname = Bench App {i}\ndescription = Stub app {i}\n")
+        with open(os.path.join(folder, "icons", "icon.png"), "wb") as f:
+            f.write(STUB_ICON)
+        with open(os.path.join(folder, "start.py"), "w") as f:
+            f.write(STUB_START)
+        # The stub's "venv" is the interpreter running the benchmark
+        if os.name == "nt":
+            os.makedirs(os.path.join(folder, "venv", "Scripts"))
+            shutil.copy(sys.executable, os.path.join(folder, "venv", "Scripts", "python.exe"))
+        else:
+            os.makedirs(os.path.join(folder, "venv", "bin"))
+            os.symlink(sys.executable, os.path.join(folder, "venv", "bin", "python"))
+
+    os.environ.update({
+        "DATABASE_URL": "sqlite:///" + os.path.join(workspace, "bench.db"),
+        "FILE_STORAGE_DIR": os.path.join(workspace, "files"),
+        "EVENT_LOG_DIR": os.path.join(workspace, "logs"),
+        "APPS_DIR": apps_dir,
+        "SUPERVISOR_APPS_DIR": apps_dir,
+        "SUPERVISOR_LOG_DIR": os.path.join(workspace, "app-logs"),
+        "SUPERVISOR_ECHO_APP_LOGS": "0",
+        "SUPERVISOR_APP_RESTART": "no",
+        "BULK_MAX_ITEMS": str(max(10000, args.logs)),
+    })
+    return workspace
+
+
+def rss_mb():
+    # Current resident set size of this process
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+        except ImportError:
+            return None
+
+
+class InProcessClient:
+    def __init__(self, flask_app, user_id=None):
+        self.client = flask_app.test_client()
+        if user_id is not None:
+            with self.client.session_transaction() as session:
+                session["_user_id"] = str(user_id)
+                session["_fresh"] = True
+
+    def call(self, method, path, json_body=None, upload=None):
+        kwargs = {}
+        if json_body is not None:
+            kwargs["json"] = json_body
+        if upload is not None:
+            field, filename, data = upload
+            kwargs["data"] = {field: (io.BytesIO(data), filename)}
+        resp = self.client.open(path, method=method, **kwargs)
+        return resp.status_code, len(resp.get_data())
+
+
+class HttpClient:
+    def __init__(self, flask_app, base_url, user_id=None):
+        import requests
+        self.base_url = base_url
+        self.session = requests.Session()
+        if user_id is not None:
+            serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+            cookie = serializer.dumps({"_user_id": str(user_id), "_fresh": True})
+            self.session.cookies.set(flask_app.config["SESSION_COOKIE_NAME"], cookie)
+
+    def call(self, method, path, json_body=None, upload=None):
+        files = None
+        if upload is not None:
+            field, filename, data = upload
+            files = {field: (filename, data)}
+        resp = self.session.request(method, self.base_url + path, json=json_body, files=files)
+        return resp.status_code, len(resp.content)
+
+
+def serve_http(flask_app):
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args):
+            pass
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = make_server("127.0.0.1", port, flask_app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}"
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100.0
+    low = int(k)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (k - low)
+
+
+def run_scenario(name, make_client, request, total, concurrency):
+    # request(client, i) -> (status, bytes) or (status, bytes, seconds) when
+    # only part of the call should count; each worker thread gets its own client
+    local = threading.local()
+    latencies = []
+    errors = 0
+    sizes = 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors, sizes
+        if not hasattr(local, "client"):
+            local.client = make_client()
+        start = time.perf_counter()
+        try:
+            result = request(local.client, i)
+        except Exception as e:
+            result = (599, 0)
+            print(f"  {name} request {i} failed: {e}")
+        elapsed = time.perf_counter() - start
+        status, size = result[:2]
+        if len(result) > 2:
+            elapsed = result[2]
+        with lock:
+            latencies.append(elapsed)
+            sizes += size
+            if status >= 400:
+                errors += 1
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(wall, 3),
+        "throughput": round(total / wall, 1) if wall else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+        "avg_bytes": round(sizes / total) if total else 0,
+        "rss_mb": rss_mb()
+    }
+
+
+def seed(client, args):
+    print(f"Seeding {args.files} files, {args.logs} log entries...")
+    for i in range(args.files):
+        client.call("POST", "/api/files/bench", upload=("file", f"file{i:05d}.bin", os.urandom(min(args.file_size, 4096))))
+    batch = 10000
+    for start in range(0, args.logs, batch):
+        events = [{"event": f"bench event {i}"} for i in range(start, min(start + batch, args.logs))]
+        client.call("POST", "/api/logs/bulk", json_body={"events": events})
+    for i in range(200):
+        client.call("POST", "/api/messages/send", json_body={"sender": "bench", "receiver": "bench", "message": {"n": i}})
+
+
+def build_scenarios(args, backend_client, supervisor_client, launchable):
+    payload = os.urandom(args.file_size)
+
+    def upload(c, i):
+        # Vary the content so every upload is a new blob
+        return c.call("POST", "/api/files/bench-upload", upload=("file", f"up{i:06d}.bin", payload + i.to_bytes(8, "big")))
+
+    free_apps = queue.Queue()
+    for folder in launchable:
+        free_apps.put(folder)
+
+    def launch(c, i):
+        # Times launch-until-ready only; the stop afterwards makes the next
+        # round on this app a real launch again
+        folder = free_apps.get()
+        try:
+            start = time.perf_counter()
+            status, size = c.call("POST", "/api/supervisor/launch", json_body={"source": "Bench", "folder": folder})
+            elapsed = time.perf_counter() - start
+            c.call("POST", "/api/supervisor/stop", json_body={"folder": folder, "wait": True})
+        finally:
+            free_apps.put(folder)
+        return status, size, elapsed
+
+    scenarios = [
+        ("apps.list", backend_client, lambda c, i: c.call("GET", "/api/apps"), args.requests),
+        ("apps.icon", backend_client, lambda c, i: c.call("GET", f"/api/icons/Bench/app{i % args.apps:04d}"), args.requests),
+        ("files.list", backend_client, lambda c, i: c.call("GET", "/api/files/bench?limit=100"), args.requests),
+        ("files.download", backend_client,
+         lambda c, i: c.call("GET", f"/api/files/bench/file{i % max(1, args.files):05d}.bin"), args.requests),
+        ("files.upload", backend_client, upload, args.requests),
+        ("messages.send", backend_client,
+         lambda c, i: c.call("POST", "/api/messages/send", json_body={"sender": "bench", "receiver": "bench", "message": {"n": i}}),
+         args.requests),
+        ("messages.fetch", backend_client, lambda c, i: c.call("GET", "/api/messages/bench?cursor=0&limit=100"), args.requests),
+        ("logs.append", backend_client, lambda c, i: c.call("POST", "/api/logs", json_body={"event": f"bench {i}"}), args.requests),
+        ("logs.query", backend_client, lambda c, i: c.call("GET", "/api/logs?limit=100"), args.requests),
+        ("supervisor.status", supervisor_client, lambda c, i: c.call("GET", "/api/supervisor/status"), args.requests),
+    ]
+    if launchable:
+        scenarios.append(("supervisor.launch", supervisor_client, launch, args.launches))
+    return scenarios
+
+
+def selected(name, only):
+    if not only:
+        return True
+    return any(name == o or name.startswith(o.rstrip(".") + ".") for o in only.split(","))
+
+
+def compare(report, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline_report = json.load(f)
+    baseline = baseline_report["results"]
+    results = report["results"]
+    regressions = []
+    print(f"\nCompared with {baseline_path} (threshold {threshold:.0%}):")
+    old_meta = baseline_report.get("meta", {})
+    if (old_meta.get("mode"), old_meta.get("params")) != (report["meta"]["mode"], report["meta"]["params"]):
+        print("  note: the baseline was recorded with a different mode or parameters")
+    for name, current in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        p95 = (current["p95_ms"] - old["p95_ms"]) / old["p95_ms"] if old["p95_ms"] else 0.0
+        tput = (current["throughput"] - old["throughput"]) / old["throughput"] if old["throughput"] else 0.0
+        flag = ""
+        if p95 > threshold or tput < -threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:<20} p95 {p95:+7.1%}  throughput {tput:+7.1%}{flag}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    args = parse_args()
+    workspace = make_workspace(args)
+    sys.path[:0] = [os.path.join(ROOT, "backend"), ROOT]
+    try:
+        import app as backend
+        import supervisor
+
+        with backend.app.app_context():
+            backend.db.session.add(backend.User(id=1, username="bench", password_hash="-"))
+            backend.db.session.commit()
+
+        if args.http:
+            backend_url = serve_http(backend.app)
+            supervisor_url = serve_http(supervisor.app)
+            backend_client = lambda: HttpClient(backend.app, backend_url, user_id=1)
+            supervisor_client = lambda: HttpClient(supervisor.app, supervisor_url)
+        else:
+            backend_client = lambda: InProcessClient(backend.app, user_id=1)
+            supervisor_client = lambda: InProcessClient(supervisor.app)
+
+        seed(backend_client(), args)
+        # Let the write buffers drain before measuring
+        time.sleep(0.5)
+
+        launchable = [f"app{i:04d}" for i in range(min(args.apps, max(1, args.concurrency)))]
+        results = {}
+        print(f"{'scenario':<20} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'rss MB':>7}")
+        for name, make_client, request, total in build_scenarios(args, backend_client, supervisor_client, launchable):
+            if not selected(name, args.only):
+                continue
+            concurrency = min(args.concurrency, len(launchable)) if name == "supervisor.launch" else args.concurrency
+            result = run_scenario(name, make_client, request, total, concurrency)
+            results[name] = result
+            print(f"{name:<20} {result['throughput']:>9} {result['p50_ms']:>9} {result['p95_ms']:>9} "
+                  f"{result['p99_ms']:>9} {result['errors']:>7} {result['rss_mb']:>7}")
+
+        supervisor.warm_pool.shutdown()
+
+        report = {
+            "meta": {
+                "timestamp": int(time.time()),
+                "git_revision": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "mode": "http" if args.http else "in-process",
+                "params": {k: v for k, v in vars(args).items() if k not in ("save", "compare", "keep", "only")}
+            },
+            "results": results
+        }
+        if args.save:
+            with open(args.save, "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            print(f"\nSaved results to {args.save}")
+
+        if args.compare and compare(report, args.compare, args.threshold):
+            return 1
+        return 0
+    finally:
+        if not args.keep:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import os
+import time
+import threading
+import selectors
+from collections import deque
+
+
+class ExitWatcher:
+    # Calls on_exit(key, proc, returncode) as soon as a child exits. On Linux
+    # every child gets a pidfd and one thread waits on all of them through a
+    # selector; elsewhere each child gets a thread blocked in proc.wait().
+    def __init__(self, on_exit):
+        self.on_exit = on_exit
+        self._selector = selectors.DefaultSelector() if hasattr(os, "pidfd_open") else None
+        if self._selector is not None:
+            self._lock = threading.Lock()
+            self._pending = []
+            self._wake_r, self._wake_w = os.pipe()
+            os.set_blocking(self._wake_r, False)
+            self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+            threading.Thread(target=self._run, name="exit-watcher", daemon=True).start()
+
+    def watch(self, key, proc):
+        if self._selector is not None:
+            try:
+                fd = os.pidfd_open(proc.pid)
+            except OSError:
+                # Already reaped, or the kernel has no pidfd support
+                fd = None
+            if fd is not None:
+                with self._lock:
+                    self._pending.append((fd, (key, proc)))
+                os.write(self._wake_w, b"\0")
+                return
+        threading.Thread(target=self._fire, args=(key, proc), daemon=True).start()
+
+    def _run(self):
+        while True:
+            for sel_key, _ in self._selector.select():
+                if sel_key.data is None:
+                    try:
+                        os.read(self._wake_r, 4096)
+                    except BlockingIOError:
+                        pass
+                    with self._lock:
+                        pending, self._pending = self._pending, []
+                    for fd, data in pending:
+                        self._selector.register(fd, selectors.EVENT_READ, data)
+                    continue
+                self._selector.unregister(sel_key.fd)
+                os.close(sel_key.fd)
+                self._fire(*sel_key.data)
+
+    def _fire(self, key, proc):
+        code = proc.wait()
+        try:
+            self.on_exit(key, proc, code)
+        except Exception as e:
+            print(f"[Supervisor] Exit handler for {key} failed: {e}")
+
+
+class RestartTracker:
+    # Exponential backoff for one restartable process. A run that lasted
+    # stable_after seconds resets the backoff; loop_limit exits inside
+    # loop_window seconds is a crash loop and exited() returns None.
+    def __init__(self, base_delay=0.1, max_delay=30.0, stable_after=30.0, loop_window=60.0, loop_limit=5):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stable_after = stable_after
+        self.loop_window = loop_window
+        self.loop_limit = loop_limit
+        self.restarts = 0
+        self.failures = 0
+        self.crash_loop = False
+        self.started_at = None
+        self.last_exit_code = None
+        self.last_exit_at = None
+        self._exits = deque()
+
+    def started(self, automatic=False):
+        if automatic:
+            self.restarts += 1
+        else:
+            # A manual start clears a previous crash loop
+            self.crash_loop = False
+            self.failures = 0
+            self._exits.clear()
+        self.started_at = time.monotonic()
+
+    def exited(self, code):
+        # Returns the delay before the next restart, or None to give up
+        now = time.monotonic()
+        self.last_exit_code = code
+        self.last_exit_at = time.time()
+        if self.started_at is not None and now - self.started_at >= self.stable_after:
+            self.failures = 0
+        self.failures += 1
+        self._exits.append(now)
+        while self._exits and now - self._exits[0] > self.loop_window:
+            self._exits.popleft()
+        if len(self._exits) >= self.loop_limit:
+            self.crash_loop = True
+            return None
+        return min(self.base_delay * 2 ** (self.failures - 1), self.max_delay)
+
+    def to_dict(self):
+        return {
+            "restarts": self.restarts,
+            "last_exit_code": self.last_exit_code,
+            "last_exit_at": self.last_exit_at,
+            "crash_loop": self.crash_loop
+        }
@@ -0,0 +1,143 @@
+import asyncio
+import random
+import threading
+
+
+class HealthChecker:
+    # One asyncio loop on one thread checks every registered app, each in its
+    # own coroutine, over a keep-alive HTTP/1.1 connection that is reused
+    # between checks. Apps are checked quickly while starting, every
+    # `interval` (+/- jitter) while healthy, and with exponential backoff up
+    # to `max_backoff` while failing. on_change(name, status) fires as soon
+    # as an app's status changes.
+    def __init__(self, on_change, interval=10.0, timeout=2.0, jitter=0.2,
+                 startup_interval=0.5, startup_grace=60.0, max_backoff=60.0,
+                 path="/health", host="127.0.0.1"):
+        self.on_change = on_change
+        self.interval = interval
+        self.timeout = timeout
+        self.jitter = jitter
+        self.startup_interval = startup_interval
+        self.startup_grace = startup_grace
+        self.max_backoff = max_backoff
+        self.path = path
+        self.host = host
+        self._tasks = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="health-checker", daemon=True)
+        self._thread.start()
+
+    def register(self, name, port):
+        self._loop.call_soon_threadsafe(self._start, name, port)
+
+    def unregister(self, name):
+        self._loop.call_soon_threadsafe(self._stop, name)
+
+    def _start(self, name, port):
+        self._stop(name)
+        self._tasks[name] = self._loop.create_task(self._watch(name, port))
+
+    def _stop(self, name):
+        task = self._tasks.pop(name, None)
+        if task:
+            task.cancel()
+
+    def _sleep_for(self, base):
+        return max(0.05, base * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    async def _watch(self, name, port):
+        conn = None
+        status = "starting"
+        failures = 0
+        started = self._loop.time()
+        try:
+            while True:
+                try:
+                    conn, ok = await self._check(conn, port)
+                    new_status = "healthy" if ok else "unresponsive"
+                except (OSError, asyncio.TimeoutError, ValueError):
+                    conn = None
+                    new_status = "unreachable"
+
+                if new_status == "healthy":
+                    failures = 0
+                    delay = self.interval
+                elif status == "starting" and self._loop.time() - started < self.startup_grace:
+                    # Still booting: poll fast so readiness is seen quickly
+                    delay = self.startup_interval
+                    new_status = "starting"
+                else:
+                    failures += 1
+                    delay = min(self.max_backoff, self.interval * 2 ** min(failures - 1, 10))
+
+                if new_status != status:
+                    status = new_status
+                    self.on_change(name, status)
+                await asyncio.sleep(self._sleep_for(delay))
+        finally:
+            self._close(conn)
+
+    async def _check(self, conn, port):
+        # A reused keep-alive connection may have been closed by the app while
+        # idle; retry once on a fresh connection before reporting a failure
+        try:
+            return await asyncio.wait_for(self._probe(conn, port), self.timeout)
+        except (OSError, asyncio.TimeoutError, ValueError):
+            self._close(conn)
+            if conn is None:
+                raise
+        return await asyncio.wait_for(self._probe(None, port), self.timeout)
+
+    def _close(self, conn):
+        if conn:
+            conn[1].close()
+        return None
+
+    async def _probe(self, conn, port):
+        if conn is None:
+            conn = await asyncio.open_connection(self.host, port)
+        try:
+            return await self._request(conn, port)
+        except BaseException:
+            self._close(conn)
+            raise
+
+    async def _request(self, conn, port):
+        reader, writer = conn
+        writer.write(
+            f"GET {self.path} HTTP/1.1\r\nHost: localhost:{port}\r\n"
+            f"Connection: keep-alive\r\n\r\n".encode("ascii")
+        )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed")
+        parts = status_line.split()
+        if len(parts) < 2:
+            raise ValueError("Malformed status line")
+        code = int(parts[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip().lower()
+
+        if "content-length" in headers:
+            await reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await reader.read()
+            headers["connection"] = "close"
+
+        if headers.get("connection") == "close" or parts[0] == b"HTTP/1.0":
+            conn = self._close(conn)
+        return conn, 200 <= code < 400
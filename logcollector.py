@@ -0,0 +1,209 @@
+import os
+import sys
+import time
+import threading
+import selectors
+import queue
+from collections import deque
+
+
+class LogCollector:
+    # Reads the stdout/stderr pipes of every child through one selector loop
+    # on one thread. Each app gets a bounded ring buffer of recent lines (for
+    # tail/stream) and a size-rotated file under log_dir. Memory is bounded by
+    # buffer_lines * max_line per app; thread count is constant.
+    # Echoing to the console goes through a bounded queue drained by its own
+    # thread; when the console cannot keep up, chunks are dropped rather
+    # than stalling the reads.
+    def __init__(self, log_dir, buffer_lines=1000, max_bytes=10 * 1024 * 1024,
+                 backups=3, max_line=16 * 1024, read_size=64 * 1024, echo_queue=256):
+        self.log_dir = log_dir
+        self.buffer_lines = buffer_lines
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.max_line = max_line
+        self.read_size = read_size
+        self._apps = {}
+        self._cond = threading.Condition()
+        self._echo = queue.Queue(maxsize=echo_queue)
+        self._echo_dropped = 0
+        self._echo_thread = None
+        os.makedirs(log_dir, exist_ok=True)
+        # Windows cannot select() on pipes; fall back to a reader thread per pipe
+        self._selector = selectors.DefaultSelector() if os.name != "nt" else None
+        if self._selector is not None:
+            self._wake_r, self._wake_w = os.pipe()
+            os.set_blocking(self._wake_r, False)
+            self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+            self._pending = []
+            self._thread = threading.Thread(target=self._run, name="log-collector", daemon=True)
+            self._thread.start()
+
+    def attach(self, name, pipe, stream="stdout", echo=False):
+        # Takes ownership of a child's pipe; it is closed once the child exits
+        self._app(name)
+        if self._selector is None:
+            threading.Thread(target=self._read_blocking, args=(name, pipe, stream, echo), daemon=True).start()
+            return
+        fd = pipe.fileno()
+        os.set_blocking(fd, False)
+        with self._cond:
+            self._pending.append((pipe, {"name": name, "stream": stream, "echo": echo, "partial": b""}))
+        os.write(self._wake_w, b"\0")
+
+    def _app(self, name):
+        with self._cond:
+            entry = self._apps.get(name)
+            if entry is None:
+                path = os.path.join(self.log_dir, f"{os.path.basename(name)}.log")
+                entry = self._apps[name] = {
+                    "lines": deque(maxlen=self.buffer_lines),
+                    "seq": 0,
+                    "path": path,
+                    "file": None,
+                    "size": os.path.getsize(path) if os.path.exists(path) else 0
+                }
+            return entry
+
+    def _run(self):
+        while True:
+            for key, _ in self._selector.select():
+                if key.data is None:
+                    try:
+                        os.read(self._wake_r, 4096)
+                    except BlockingIOError:
+                        pass
+                    with self._cond:
+                        pending, self._pending = self._pending, []
+                    for pipe, state in pending:
+                        self._selector.register(pipe, selectors.EVENT_READ, state)
+                    continue
+                try:
+                    data = os.read(key.fd, self.read_size)
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    data = b""
+                if data:
+                    self._feed(key.data, data)
+                else:
+                    self._selector.unregister(key.fileobj)
+                    key.fileobj.close()
+                    self._feed(key.data, b"", eof=True)
+
+    def _read_blocking(self, name, pipe, stream, echo):
+        state = {"name": name, "stream": stream, "echo": echo, "partial": b""}
+        for chunk in iter(lambda: pipe.read1(self.read_size), b""):
+            self._feed(state, chunk)
+        pipe.close()
+        self._feed(state, b"", eof=True)
+
+    def _feed(self, state, data, eof=False):
+        buf = state["partial"] + data
+        lines = buf.split(b"\n")
+        state["partial"] = lines.pop()
+        if eof and state["partial"]:
+            lines.append(state["partial"])
+            state["partial"] = b""
+        elif len(state["partial"]) > self.max_line:
+            lines.append(state["partial"])
+            state["partial"] = b""
+        if not lines:
+            return
+        self._write(state["name"], state["stream"], [l.rstrip(b"\r")[:self.max_line] for l in lines], state["echo"])
+
+    def _write(self, name, stream, raw_lines, echo):
+        now = time.time()
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+        entry = self._app(name)
+        texts = [l.decode("utf-8", errors="replace") for l in raw_lines]
+        block = "".join(f"{stamp} [{stream}] {text}\n" for text in texts).encode("utf-8")
+        with self._cond:
+            for text in texts:
+                entry["seq"] += 1
+                entry["lines"].append({"seq": entry["seq"], "time": now, "stream": stream, "text": text})
+            self._write_file(entry, block)
+            self._cond.notify_all()
+        if echo:
+            self._queue_echo("".join(f"[{name} {stream}] {text}\n" for text in texts))
+
+    def _queue_echo(self, text):
+        with self._cond:
+            if self._echo_thread is None:
+                self._echo_thread = threading.Thread(target=self._run_echo, name="log-echo", daemon=True)
+                self._echo_thread.start()
+        try:
+            self._echo.put_nowait(text)
+        except queue.Full:
+            with self._cond:
+                self._echo_dropped += 1
+
+    def _run_echo(self):
+        while True:
+            text = self._echo.get()
+            with self._cond:
+                dropped, self._echo_dropped = self._echo_dropped, 0
+            if dropped:
+                text = f"[Supervisor] {dropped} chunk(s) of app output not echoed; see the log files\n" + text
+            try:
+                # One write per chunk instead of one print per line
+                sys.stdout.write(text)
+                sys.stdout.flush()
+            except (OSError, ValueError):
+                pass
+
+    def _write_file(self, entry, block):
+        try:
+            if entry["size"] + len(block) > self.max_bytes:
+                self._rotate(entry)
+            if entry["file"] is None:
+                entry["file"] = open(entry["path"], "ab")
+            entry["file"].write(block)
+            entry["file"].flush()
+            entry["size"] += len(block)
+        except OSError as e:
+            print(f"[Supervisor] Could not write log {entry['path']}: {e}")
+
+    def _rotate(self, entry):
+        if entry["file"] is not None:
+            entry["file"].close()
+            entry["file"] = None
+        path = entry["path"]
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{i}"):
+                os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+        if self.backups > 0 and os.path.exists(path):
+            os.replace(path, f"{path}.1")
+        elif os.path.exists(path):
+            os.remove(path)
+        entry["size"] = 0
+
+    def tail(self, name, lines=100, since=None, stream=None):
+        # Returns (lines, last_seq); `since` returns only lines after that seq
+        with self._cond:
+            entry = self._apps.get(name)
+            if entry is None:
+                return None, 0
+            result = [l for l in entry["lines"]
+                      if (since is None or l["seq"] > since) and (stream is None or l["stream"] == stream)]
+            return result[-lines:] if lines else result, entry["seq"]
+
+    def wait(self, name, after, timeout):
+        # Blocks until `name` has a line newer than `after` or timeout passes
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                entry = self._apps.get(name)
+                if entry is not None and entry["seq"] > after:
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+
+    def names(self):
+        with self._cond:
+            return {
+                name: {"lines": len(e["lines"]), "last_seq": e["seq"], "file": e["path"], "size": e["size"]}
+                for name, e in self._apps.items()
+            }
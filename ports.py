@@ -0,0 +1,48 @@
+import os
+import socket
+import threading
+from collections import deque
+
+
+class PortAllocator:
+    # Hands out ports from [start, end) in O(1) from a free list. A port is
+    # "reserved" by binding a socket to it, so two launches can never get the
+    # same port and a port already taken by something else is skipped. The
+    # caller closes the reservation socket right before spawning the app.
+    def __init__(self, start=7000, end=8000, host="127.0.0.1"):
+        self.start = start
+        self.end = end
+        self.host = host
+        self._lock = threading.Lock()
+        self._free = deque(range(start, end))
+        self._in_use = set()
+
+    def reserve(self):
+        # Returns (port, socket). Raises RuntimeError when the range is exhausted.
+        with self._lock:
+            for _ in range(len(self._free)):
+                port = self._free.popleft()
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                if os.name != "nt":
+                    # Don't let TIME_WAIT leftovers of an exited app block reuse
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                try:
+                    sock.bind((self.host, port))
+                except OSError:
+                    # Held by a process we did not start; retry it later
+                    sock.close()
+                    self._free.append(port)
+                    continue
+                self._in_use.add(port)
+                return port, sock
+        raise RuntimeError("No free port available")
+
+    def release(self, port):
+        with self._lock:
+            if port in self._in_use:
+                self._in_use.remove(port)
+                self._free.append(port)
+
+    def in_use(self):
+        with self._lock:
+            return sorted(self._in_use)
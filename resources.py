@@ -0,0 +1,180 @@
+import os
+import time
+import threading
+from collections import deque
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def parse_limits(settings):
+    # Reads limit keys from an app's [Supervisor] config.ini section
+    limits = {}
+    for key, cast in (("memory_mb", float), ("cpu_percent", float),
+                      ("max_open_files", int), ("cpu_seconds", int)):
+        if settings.get(key):
+            limits[key] = cast(settings[key])
+    limits["restart_on_limit"] = settings.get("restart_on_limit", "false").lower() in ("1", "true", "yes")
+    return limits
+
+
+def apply_rlimits(pid, limits):
+    # setrlimit on an already running child (Linux prlimit); avoids preexec_fn,
+    # which is unsafe in a threaded parent, and also covers warm-pool processes
+    if resource is None or not hasattr(resource, "prlimit"):
+        return []
+    applied = []
+    for key, rlimit in (("max_open_files", resource.RLIMIT_NOFILE), ("cpu_seconds", resource.RLIMIT_CPU)):
+        if key in limits:
+            try:
+                resource.prlimit(pid, rlimit, (limits[key], limits[key]))
+                applied.append(key)
+            except (OSError, ValueError) as e:
+                print(f"[Supervisor] Could not set {key} for PID {pid}: {e}")
+    return applied
+
+
+class Cgroups:
+    # cgroups v2 memory.max / cpu.max under <root>/<parent>/<app>, when the
+    # unified hierarchy is mounted and writable; otherwise every call is a no-op.
+    # Nothing is written until the first app with limits is attached.
+    def __init__(self, parent="apollosuite", root=CGROUP_ROOT):
+        self.root = root
+        self.base = os.path.join(root, parent)
+        self.available = False
+        self._ready = False
+        self._lock = threading.Lock()
+        try:
+            with open(os.path.join(root, "cgroup.controllers")) as f:
+                controllers = f.read().split()
+            self.available = "memory" in controllers and "cpu" in controllers
+        except OSError:
+            pass
+
+    def _setup(self):
+        with self._lock:
+            if self._ready or not self.available:
+                return self.available
+            try:
+                os.makedirs(self.base, exist_ok=True)
+                with open(os.path.join(self.root, "cgroup.subtree_control"), "w") as f:
+                    f.write("+memory +cpu")
+                with open(os.path.join(self.base, "cgroup.subtree_control"), "w") as f:
+                    f.write("+memory +cpu")
+                self._ready = True
+            except OSError as e:
+                print(f"[Supervisor] cgroup controllers unavailable: {e}")
+                self.available = False
+            return self.available
+
+    def attach(self, name, pid, limits):
+        if not self.available or not ({"memory_mb", "cpu_percent"} & set(limits)):
+            return False
+        if not self._setup():
+            return False
+        path = os.path.join(self.base, name)
+        try:
+            os.makedirs(path, exist_ok=True)
+            if "memory_mb" in limits:
+                with open(os.path.join(path, "memory.max"), "w") as f:
+                    f.write(str(int(limits["memory_mb"] * 1024 * 1024)))
+            if "cpu_percent" in limits:
+                with open(os.path.join(path, "cpu.max"), "w") as f:
+                    f.write(f"{int(limits['cpu_percent'] * 1000)} 100000")
+            with open(os.path.join(path, "cgroup.procs"), "w") as f:
+                f.write(str(pid))
+            return True
+        except OSError as e:
+            print(f"[Supervisor] Could not apply cgroup limits to {name}: {e}")
+            return False
+
+    def remove(self, name):
+        # Once the app's processes are gone its cgroup is empty and can go too
+        if not self._ready:
+            return
+        try:
+            os.rmdir(os.path.join(self.base, name))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[Supervisor] Could not remove cgroup of {name}: {e}")
+
+
+def read_proc(pid):
+    # Returns (cpu ticks, rss bytes, open fds) from /proc, or None if unavailable
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = int(fields[11]) + int(fields[12])  # utime + stime
+        rss = int(fields[21]) * PAGE_SIZE
+        try:
+            fds = len(os.listdir(f"/proc/{pid}/fd"))
+        except OSError:
+            fds = None
+        return ticks, rss, fds
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class ResourceSampler:
+    # Keeps the last `history` samples per app in a ring buffer
+    def __init__(self, history=120):
+        self.history = history
+        self._lock = threading.Lock()
+        self._series = {}
+        self._last = {}
+
+    def sample(self, name, pid):
+        stats = read_proc(pid)
+        if stats is None:
+            return None
+        ticks, rss, fds = stats
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(name)
+            cpu = None
+            if last and last[0] == pid and now > last[1]:
+                cpu = round((ticks - last[2]) / CLOCK_TICKS / (now - last[1]) * 100, 1)
+            self._last[name] = (pid, now, ticks)
+            point = {
+                "time": int(time.time()),
+                "rss_mb": round(rss / (1024 * 1024), 1),
+                "cpu_percent": cpu,
+                "open_fds": fds
+            }
+            self._series.setdefault(name, deque(maxlen=self.history)).append(point)
+        return point
+
+    def latest(self, name):
+        with self._lock:
+            series = self._series.get(name)
+            return series[-1] if series else None
+
+    def series(self, name):
+        with self._lock:
+            return list(self._series.get(name, ()))
+
+    def forget(self, name):
+        with self._lock:
+            self._series.pop(name, None)
+            self._last.pop(name, None)
+
+
+def over_limit(point, limits):
+    # Returns a reason string if a sample breaks the app's limits; used for
+    # restart_on_limit and as the only enforcement where cgroups are missing
+    if point is None:
+        return None
+    if "memory_mb" in limits and point["rss_mb"] > limits["memory_mb"]:
+        return f"RSS {point['rss_mb']} MB > {limits['memory_mb']} MB"
+    if "cpu_percent" in limits and point["cpu_percent"] is not None and point["cpu_percent"] > limits["cpu_percent"]:
+        return f"CPU {point['cpu_percent']}% > {limits['cpu_percent']}%"
+    if "max_open_files" in limits and point["open_fds"] is not None and point["open_fds"] >= limits["max_open_files"] * 0.95:
+        return f"{point['open_fds']} open files near limit {limits['max_open_files']}"
+    return None
@@ -1,15 +1,31 @@
 import os
+import json
+import atexit
 import subprocess
+import configparser
 import socket
+import http.client
 import threading
 import pathlib
 import random
 import time
 import signal
-from flask import Flask, request, jsonify
+import sys
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from apscheduler.schedulers.background import BackgroundScheduler
-import requests
+
+from healthcheck import HealthChecker
+from ports import PortAllocator
+from warmpool import WarmPool
+from appproxy import AppProxy
+from resources import Cgroups, ResourceSampler, parse_limits, apply_rlimits, over_limit
+from logcollector import LogCollector
+from exitwatch import ExitWatcher, RestartTracker
+
+# telemetry.py is shared with the backend
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from telemetry import Telemetry
 
 env = os.environ.copy()
 env["PYTHONIOENCODING"] = "utf-8"
@@ -18,11 +34,29 @@ app = Flask(__name__)
 CORS(app, resources={r"/api/*"})
 running_apps = {}
 assigned_ports = {}
-process_lock = threading.Lock()
+
+# Prometheus metrics at /metrics; SUPERVISOR_PROFILE_SLOW_MS > 0 also writes
+# folded stack samples of slower requests to SUPERVISOR_PROFILE_DIR
+telemetry = Telemetry(
+    app, "apollo_supervisor",
+    profile_dir=os.getenv("SUPERVISOR_PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "profiles")),
+    slow_request_seconds=float(os.getenv("SUPERVISOR_PROFILE_SLOW_MS", "0")) / 1000,
+    sample_interval=float(os.getenv("SUPERVISOR_PROFILE_SAMPLE_MS", "5")) / 1000
+)
+telemetry.gauge("running_apps", "Apps currently running", lambda: len(running_apps))
+telemetry.gauge("warm_interpreters", "Idle pre-started interpreters", lambda: sum(p["warm"] for p in warm_pool.status().values()))
+process_lock = telemetry.timed_lock("process_lock")
+
+STOP_TIMEOUT = float(os.getenv("SUPERVISOR_STOP_TIMEOUT", "10"))
+READY_TIMEOUT = float(os.getenv("SUPERVISOR_READY_TIMEOUT", "30"))
+# SUPERVISOR_MODE=production runs the backend under backend/serve.py
+# (multi-worker) and the supervisor itself under waitress when installed
+PRODUCTION = os.getenv("SUPERVISOR_MODE", "dev") == "production"
 
 # Automatically find ApolloSuite root from this file's location
 PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
 print(f"[Supervisor] Project root detected: {PROJECT_ROOT}")
+APPS_DIR = os.path.abspath(os.getenv("SUPERVISOR_APPS_DIR", os.path.join(PROJECT_ROOT, "apps")))
 def is_executable_available(cmd):
     from shutil import which
     return which(cmd[0]) is not None
@@ -30,14 +64,18 @@ def is_executable_available(cmd):
 core_services = {
     "backend": {
         "path": os.path.join(PROJECT_ROOT, "backend"),
-        "start_cmd": ["python", "app.py"],
+        "start_cmd": ["python", "serve.py" if PRODUCTION else "app.py"],
         "port": 5000,
+        "depends_on": [],
+        "ready": {"type": "http", "path": "/api"},
         "process": None,
     },
     "frontend": {
         "path": os.path.join(PROJECT_ROOT, "frontend"),
         "start_cmd": ["npm", "run", "dev"],
         "port": 5173,
+        "depends_on": [],
+        "ready": {"type": "tcp"},
         "process": None,
     },
 }
@@ -49,14 +87,31 @@ print(core_services["frontend"]["path"])
 def is_process_alive(proc):
     return proc and proc.poll() is None
 
-def stream_output(pipe, label):
-    for line in iter(pipe.readline, b''):
-        print(f"[{label}] {line.decode(errors='replace').rstrip()}")
-
-def start_core_service(name):
-    with process_lock:
-        svc = core_services[name]
-        proc = svc.get("process")
+# Output of core services and apps goes through one selector thread into
+# per-app ring buffers and rotated files under SUPERVISOR_LOG_DIR
+log_collector = LogCollector(
+    os.getenv("SUPERVISOR_LOG_DIR", os.path.join(PROJECT_ROOT, "logs")),
+    buffer_lines=int(os.getenv("SUPERVISOR_LOG_BUFFER_LINES", "1000")),
+    max_bytes=int(os.getenv("SUPERVISOR_LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+    backups=int(os.getenv("SUPERVISOR_LOG_BACKUPS", "3"))
+)
+ECHO_APP_LOGS = os.getenv("SUPERVISOR_ECHO_APP_LOGS", "1") == "1"
+
+def collect_output(name, process, echo):
+    log_collector.attach(name, process.stdout, "stdout", echo=echo)
+    log_collector.attach(name, process.stderr, "stderr", echo=echo)
+
+# Each core service has its own lock for start/stop, like apps (see
+# app_lock); process_lock is only taken to update core_services
+core_locks = {name: threading.Lock() for name in core_services}
+
+def start_core_service(name, automatic=False):
+    svc = core_services[name]
+    with core_locks[name]:
+        with process_lock:
+            proc = svc.get("process")
+        if is_process_alive(proc):
+            return f"{name} already running (PID: {proc.pid}) at http://localhost:{svc['port']}"
 
         if name == "backend":
             target = os.path.join(svc["path"], "app.py")
@@ -66,9 +121,6 @@ def start_core_service(name):
         if not os.path.exists(target):
             return f"ERROR: Missing required file for {name} at {target}"
 
-        if is_process_alive(proc):
-            return f"{name} already running (PID: {proc.pid}) at http://localhost:{svc['port']}"
-
         if not is_executable_available(svc["start_cmd"]):
             return f"ERROR: Command '{svc['start_cmd'][0]}' not found in PATH"
 
@@ -87,73 +139,295 @@ def start_core_service(name):
             shell=(os.name == "nt"),
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
+            start_new_session=(os.name != "nt"),
             creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0,
             env=env
         )
 
-        threading.Thread(target=stream_output, args=(process.stdout, f"{name} stdout"), daemon=True).start()
-        threading.Thread(target=stream_output, args=(process.stderr, f"{name} stderr"), daemon=True).start()
+        collect_output(name, process, echo=True)
 
-        svc["process"] = process
+        with process_lock:
+            svc["process"] = process
+            svc["state"] = "starting"
+            svc["startup"] = {"started_at": time.time()}
+            core_restarts[name].started(automatic)
+        exit_watcher.watch(("core", name), process)
 
 def stop_core_service(name):
-    with process_lock:
-        svc = core_services[name]
-        proc = svc.get("process")
-        if not is_process_alive(proc):
+    cancel_restart(("core", name))
+    with core_locks[name]:
+        with process_lock:
+            svc = core_services[name]
+            proc = svc.get("process")
             svc["process"] = None
+            svc["state"] = "stopped"
+        if not is_process_alive(proc):
             return f"{name} is not running"
 
+        # Waits outside process_lock so status queries are not blocked meanwhile
+        signal_stop(proc)
+        wait_or_kill(proc)
+    return f"{name} stopped"
+
+# Crash handling: children are watched for exit (pidfd), not polled. Core
+# services are always restarted and apps according to [Supervisor] restart =
+# no | on-failure | always, with exponential backoff; a process that keeps
+# crashing is left down until it is started again by hand.
+APP_RESTART_POLICY = os.getenv("SUPERVISOR_APP_RESTART", "on-failure")
+
+def make_restart_tracker():
+    return RestartTracker(
+        base_delay=float(os.getenv("SUPERVISOR_RESTART_BASE_DELAY", "0.1")),
+        max_delay=float(os.getenv("SUPERVISOR_RESTART_MAX_DELAY", "30")),
+        stable_after=float(os.getenv("SUPERVISOR_RESTART_STABLE_AFTER", "30")),
+        loop_window=float(os.getenv("SUPERVISOR_CRASH_LOOP_WINDOW", "60")),
+        loop_limit=int(os.getenv("SUPERVISOR_CRASH_LOOP_LIMIT", "5"))
+    )
+
+core_restarts = {name: make_restart_tracker() for name in core_services}
+app_restarts = {}
+restart_timers = {}
+
+def schedule_restart(key, delay, target, *args):
+    def run():
+        with process_lock:
+            if restart_timers.get(key) is not timer:
+                return
+            del restart_timers[key]
+        target(*args)
+
+    timer = threading.Timer(delay, run)
+    timer.daemon = True
+    with process_lock:
+        previous = restart_timers.get(key)
+        restart_timers[key] = timer
+    if previous:
+        previous.cancel()
+    timer.start()
+
+def cancel_restart(key):
+    with process_lock:
+        timer = restart_timers.pop(key, None)
+    if timer:
+        timer.cancel()
+
+def restart_core_service(name):
+    tracker = core_restarts[name]
+    attempt = tracker.restarts
+    msg = boot_core_service(name, automatic=True)
+    if msg:
+        print(f"[Supervisor] {msg}")
+    if tracker.restarts == attempt:
+        # Nothing was spawned (missing command or files); back off and retry
+        handle_core_exit(name, None, None)
+
+def reap_group(proc):
+    # Children of a crashed leader (e.g. the Flask reloader) would keep its
+    # port; its session was started with start_new_session, so pgid == pid
+    if proc is not None and os.name != "nt":
         try:
-            if os.name == "nt":
-                proc.terminate()
-            else:
-                os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
-            proc.wait(timeout=10)
-        except Exception:
-            proc.kill()
-        svc["process"] = None
-        return f"{name} stopped"
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
 
-def monitor_core_services():
+def handle_core_exit(name, proc, code):
+    reap_group(proc)
     with process_lock:
-        for name, svc in core_services.items():
-            proc = svc.get("process")
-            if not is_process_alive(proc):
-                print(f"[Supervisor] Core service '{name}' is not running, restarting...")
-                msg = start_core_service(name)
-                print(f"[Supervisor] {msg}")
+        svc = core_services[name]
+        if proc is not None:
+            if svc.get("process") is not proc:
+                return  # stopped on purpose
+            svc["process"] = None
+        delay = core_restarts[name].exited(code)
+        svc["state"] = "crash_loop" if delay is None else "restarting"
+    if delay is None:
+        print(f"[Supervisor] Core service '{name}' is crash looping (last exit code {code}), not restarting")
+        return
+    print(f"[Supervisor] Core service '{name}' exited with code {code}, restarting in {delay:.2f}s")
+    schedule_restart(("core", name), delay, restart_core_service, name)
+
+def restart_crashed_app(app_source, app_folder):
+    payload, status_code = spawn_app(app_source, app_folder, automatic=True)
+    if status_code != 200:
+        print(f"[Supervisor] Could not restart {app_folder}: {payload.get('error')}")
+        with process_lock:
+            tracker = app_restarts.get(app_folder)
+            delay = tracker.exited(None) if tracker is not None else None
+        if delay is not None:
+            schedule_restart(("app", app_folder), delay, restart_crashed_app, app_source, app_folder)
+
+def handle_app_exit(app_folder, proc, code):
+    reap_group(proc)
+    with process_lock:
+        info = running_apps.get(app_folder)
+        if info is None or info["process"] is not proc or info["state"] == "stopping":
+            return
+        release_app(app_folder)
+        delay = app_restarts[app_folder].exited(code)
+    print(f"[Supervisor] {app_folder} exited with code {code}")
+    if info["restart"] == "no" or (info["restart"] == "on-failure" and code == 0):
+        return
+    if delay is None:
+        print(f"[Supervisor] {app_folder} is crash looping, not restarting")
+        return
+    print(f"[Supervisor] Restarting {app_folder} in {delay:.2f}s")
+    schedule_restart(("app", app_folder), delay, restart_crashed_app, info["source"], app_folder)
+
+def on_child_exit(key, proc, code):
+    kind, name = key
+    if kind == "core":
+        handle_core_exit(name, proc, code)
+    else:
+        handle_app_exit(name, proc, code)
+
+exit_watcher = ExitWatcher(on_child_exit)
 
 scheduler = BackgroundScheduler()
-scheduler.add_job(monitor_core_services, "interval", seconds=10)
 scheduler.start()
 
-def monitor_health(app_folder, port):
-    while app_folder in running_apps:
+# Boot graph: each core service declares depends_on and a readiness probe
+# ("tcp": port accepts connections, "http": GET path answers below 500).
+# Services start as soon as their dependencies are ready, so independent
+# ones boot in parallel, and a service only counts as ready once its probe
+# passes.
+CORE_READY_TIMEOUT = float(os.getenv("SUPERVISOR_CORE_READY_TIMEOUT", "60"))
+
+def core_boot_order():
+    # Topological order of core_services; raises ValueError on a bad graph
+    order = []
+    pending = {name: set(svc.get("depends_on", [])) for name, svc in core_services.items()}
+    for name, deps in pending.items():
+        unknown = deps - set(core_services)
+        if unknown:
+            raise ValueError(f"{name} depends on unknown service(s) {sorted(unknown)}")
+    while pending:
+        free = [name for name, deps in pending.items() if not deps - set(order)]
+        if not free:
+            raise ValueError(f"Dependency cycle between {sorted(pending)}")
+        for name in free:
+            order.append(name)
+            del pending[name]
+    return order
+
+def probe_core_service(svc):
+    ready = svc.get("ready", {"type": "tcp"})
+    try:
+        if ready["type"] == "http":
+            conn = http.client.HTTPConnection("localhost", svc["port"], timeout=1)
+            try:
+                conn.request("GET", ready.get("path", "/"))
+                return conn.getresponse().status < 500
+            finally:
+                conn.close()
+        with socket.create_connection(("localhost", svc["port"]), timeout=0.5):
+            return True
+    except (OSError, http.client.HTTPException):
+        return False
+
+def wait_core_ready(name, proc):
+    svc = core_services[name]
+    deadline = time.monotonic() + svc.get("ready_timeout", CORE_READY_TIMEOUT)
+    delay = 0.02
+    while time.monotonic() < deadline:
+        if svc.get("process") is not proc or not is_process_alive(proc):
+            return False
+        if probe_core_service(svc):
+            return True
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+    return False
+
+def boot_core_service(name, automatic=False):
+    # Starts one core service and blocks until its readiness probe passes
+    svc = core_services[name]
+    msg = start_core_service(name, automatic)
+    with process_lock:
+        proc = svc.get("process")
+        state = svc.get("state")
+    if not is_process_alive(proc):
+        return msg or f"ERROR: {name} exited during startup"
+    if state != "starting":
+        return msg  # already running
+
+    ready = wait_core_ready(name, proc)
+    with process_lock:
+        if svc.get("process") is not proc:
+            return f"ERROR: {name} exited during startup"
+        startup = svc["startup"]
+        startup["ready_after"] = round(time.time() - startup["started_at"], 3)
+        svc["state"] = "ready" if ready else "unready"
+    if not ready:
+        return f"ERROR: {name} not ready after {startup['ready_after']}s"
+    return f"{name} ready in {startup['ready_after']}s at http://localhost:{svc['port']}"
+
+def start_core_services():
+    # Returns ({name: message}, seconds the whole boot took)
+    order = core_boot_order()
+    done = {name: threading.Event() for name in order}
+    results = {}
+    boot_started = time.monotonic()
+
+    def boot(name):
         try:
-            resp = requests.get(f"http://localhost:{port}/health", timeout=2)
-            running_apps[app_folder]["status"] = "healthy" if resp.ok else "unresponsive"
-        except Exception:
-            running_apps[app_folder]["status"] = "unreachable"
-        time.sleep(30)
-
-def find_free_port():
-    PORT_RANGE = range(7000, 8000)
-    for port in PORT_RANGE:
-        if port in assigned_ports.values():
-            continue
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            if s.connect_ex(('localhost', port)) != 0:
-                return port
-    raise RuntimeError("No free port available")
+            for dep in core_services[name].get("depends_on", []):
+                done[dep].wait()
+                if core_services[dep].get("state") != "ready":
+                    results[name] = f"ERROR: {name} not started, {dep} is not ready"
+                    return
+            waited = round(time.monotonic() - boot_started, 3)
+            results[name] = boot_core_service(name)
+            if "startup" in core_services[name]:
+                core_services[name]["startup"]["waited_for_dependencies"] = waited
+        finally:
+            done[name].set()
+
+    threads = [threading.Thread(target=boot, args=(name,), daemon=True) for name in order]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {name: results[name] for name in order}, round(time.monotonic() - boot_started, 3)
+
+def on_health_change(app_folder, status):
+    info = running_apps.get(app_folder)
+    if info is not None:
+        info["status"] = status
+        print(f"[Supervisor] {app_folder} is {status}")
+        if status == "healthy":
+            mark_ready(app_folder)
+
+health_checker = HealthChecker(
+    on_health_change,
+    interval=float(os.getenv("SUPERVISOR_HEALTH_INTERVAL", "10")),
+    timeout=float(os.getenv("SUPERVISOR_HEALTH_TIMEOUT", "2")),
+    max_backoff=float(os.getenv("SUPERVISOR_HEALTH_MAX_BACKOFF", "60")),
+)
+
+def parse_port_range(value):
+    start, _, end = value.partition("-")
+    return int(start), int(end)
+
+port_allocator = PortAllocator(*parse_port_range(os.getenv("SUPERVISOR_PORT_RANGE", "7000-8000")))
+
+def release_app(app_folder):
+    # Drops a running_apps entry, returns its port to the pool and removes its
+    # cgroup; call with process_lock held once the process has exited
+    info = running_apps.pop(app_folder, None)
+    if info is None:
+        return
+    health_checker.unregister(app_folder)
+    assigned_ports.pop(info["pid"], None)
+    port_allocator.release(info["port"])
+    resource_sampler.forget(app_folder)
+    cgroups.remove(app_folder)
 
 @app.route("/api/supervisor/start_core", methods=["POST"])
 def start_core():
-    results = []
-    for name in core_services.keys():
-        msg = start_core_service(name)
-        results.append(msg)
-    return jsonify({"message": "Core services start attempted", "details": results})
+    try:
+        results, seconds = start_core_services()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"message": "Core services start attempted", "details": list(results.values()), "boot_seconds": seconds})
 
 @app.route("/api/supervisor/stop_core", methods=["POST"])
 def stop_core():
@@ -172,85 +446,309 @@ def core_status():
             status[name] = {
                 "running": is_process_alive(proc),
                 "pid": proc.pid if is_process_alive(proc) else None,
-                "port": svc.get("port")
+                "port": svc.get("port"),
+                "state": svc.get("state", "stopped"),
+                "startup": svc.get("startup"),
+                **core_restarts[name].to_dict()
             }
     return jsonify(status)
 
-@app.route("/api/supervisor/start", methods=["POST"])
-def start_app():
-    data = request.get_json()
-    app_source = data.get("source")
-    app_folder = data.get("folder")
-
-    if not (app_source and app_folder):
-        return jsonify({"error": "Missing required fields"}), 400
+# App lifecycle: starting -> ready -> stopping -> (removed). Each app has its
+# own lock for start/stop; process_lock is only held for short dict updates,
+# so a slow stop or launch never blocks status queries or other apps.
+app_locks = {}
 
-    app_path = os.path.abspath(os.path.join(PROJECT_ROOT, "apps", app_source, app_folder))
+def app_lock(app_folder):
+    with process_lock:
+        return app_locks.setdefault(app_folder, threading.Lock())
+
+def read_app_config(app_path):
+    # The optional [Supervisor] section of an app's config.ini
+    config = configparser.ConfigParser()
+    config.read(os.path.join(app_path, "config.ini"))
+    return dict(config["Supervisor"]) if "Supervisor" in config else {}
+
+# Warm pool: [Supervisor] warm_pool = N and preload = module, module in an
+# app's config.ini keep N interpreters with those modules already imported.
+# Their output is collected from the moment they are parked, so a chatty
+# interpreter cannot block on a full pipe before the handoff.
+warm_pool = WarmPool(
+    os.path.join(PROJECT_ROOT, "warmboot.py"),
+    idle_timeout=float(os.getenv("SUPERVISOR_WARM_IDLE", "600")),
+    capture=True,
+    on_spawn=lambda key, proc: collect_output(key.split("/", 1)[1], proc, echo=ECHO_APP_LOGS)
+)
+DEFAULT_WARM_POOL_SIZE = int(os.getenv("SUPERVISOR_WARM_POOL_SIZE", "0"))
+scheduler.add_job(warm_pool.evict_idle, "interval", seconds=30)
+atexit.register(warm_pool.shutdown)
+
+def configure_warm_pool(app_source, app_folder, size=None, preload=None):
+    app_path, start_script, venv_python = resolve_app(app_source, app_folder)
+    settings = read_app_config(app_path)
+    if size is None:
+        size = int(settings.get("warm_pool", DEFAULT_WARM_POOL_SIZE))
+    if preload is None:
+        preload = [m.strip() for m in settings.get("preload", "").split(",") if m.strip()]
+    if size > 0 and os.path.isfile(start_script) and os.path.isfile(venv_python):
+        warm_pool.configure(f"{app_source}/{app_folder}", venv_python, start_script, size, preload)
+    return size
+
+def resolve_app(app_source, app_folder):
+    app_path = os.path.abspath(os.path.join(APPS_DIR, app_source, app_folder))
     start_script = os.path.join(app_path, "start.py")
     venv_python = os.path.join(app_path, "venv", "bin", "python")
     if os.name == "nt":
         venv_python = os.path.join(app_path, "venv", "Scripts", "python.exe")
+    return app_path, start_script, venv_python
+
+def spawn_app(app_source, app_folder, automatic=False):
+    # Returns (payload, status_code)
+    app_path, start_script, venv_python = resolve_app(app_source, app_folder)
 
     if not os.path.isfile(start_script):
-        return jsonify({"error": f"No start.py found in {app_path}"}), 404
+        return {"error": f"No start.py found in {app_path}"}, 404
 
     if not os.path.isfile(venv_python):
-        return jsonify({"error": f"No Python interpreter found in venv for {app_folder}"}), 500
+        return {"error": f"No Python interpreter found in venv for {app_folder}"}, 500
+
+    with app_lock(app_folder):
+        with process_lock:
+            info = running_apps.get(app_folder)
+            if info and is_process_alive(info["process"]):
+                if info["state"] == "stopping":
+                    return {"error": f"{app_folder} is stopping"}, 409
+                return {"message": f"{app_folder} is already running", "pid": info["pid"], "port": info["port"]}, 200
+            # A previous instance exited on its own; reclaim its port first
+            release_app(app_folder)
 
-    with process_lock:
-        if app_folder in running_apps and is_process_alive(running_apps[app_folder]["process"]):
-            return jsonify({"message": f"{app_folder} is already running"}), 200
+        try:
+            port, reservation = port_allocator.reserve()
+        except RuntimeError as e:
+            return {"error": str(e)}, 503
+        app_env = os.environ.copy()
+        app_env["PORT"] = str(port)
+        app_env["PYTHONUNBUFFERED"] = "1"
+
+        # Hand the port over to the app only at the last moment
+        reservation.close()
+        process = warm_pool.take(f"{app_source}/{app_folder}")
+        warm = process is not None and warm_pool.handoff(process, {"PORT": str(port)})
+        if not warm:
+            try:
+                process = subprocess.Popen(
+                    [venv_python, start_script],
+                    cwd=app_path,
+                    env=app_env,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    start_new_session=(os.name != "nt"),
+                    creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0
+                )
+            except OSError as e:
+                port_allocator.release(port)
+                return {"error": f"Failed to start {app_folder}: {e}"}, 500
+            # First launch of a pooled app: warm up interpreters for next time
+            if f"{app_source}/{app_folder}" not in warm_pool.status():
+                configure_warm_pool(app_source, app_folder)
+            # Warm interpreters have been collected since they were parked
+            collect_output(app_folder, process, echo=ECHO_APP_LOGS)
+
+        settings = read_app_config(app_path)
+        limits = parse_limits(settings)
+        apply_rlimits(process.pid, limits)
+        cgroups.attach(app_folder, process.pid, limits)
+
+        with process_lock:
+            assigned_ports[process.pid] = port
+            running_apps[app_folder] = {
+                "process": process,
+                "pid": process.pid,
+                "port": port,
+                "source": app_source,
+                "status": "starting",
+                "state": "starting",
+                "started_at": time.time(),
+                "warm": warm,
+                "limits": limits,
+                "limit_strikes": 0,
+                "restart": settings.get("restart", APP_RESTART_POLICY)
+            }
+            app_restarts.setdefault(app_folder, make_restart_tracker()).started(automatic)
+        exit_watcher.watch(("app", app_folder), process)
+
+        health_checker.register(app_folder, port)
+
+    return {"message": f"{app_folder} started", "pid": process.pid, "port": port, "warm": warm}, 200
+
+def signal_stop(proc):
+    # Asks the process (and its process group) to exit
+    try:
+        if os.name == "nt":
+            proc.terminate()
+        else:
+            os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+
+def wait_or_kill(proc, timeout=STOP_TIMEOUT):
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        print(f"[Supervisor] PID {proc.pid} ignored SIGTERM for {timeout}s, killing")
+        try:
+            if os.name == "nt":
+                proc.kill()
+            else:
+                os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+        except (ProcessLookupError, PermissionError, OSError):
+            proc.kill()
+        proc.wait()
 
-        port = find_free_port()
-        env = os.environ.copy()
-        env["PORT"] = str(port)
+def finish_stop(app_folder, proc):
+    wait_or_kill(proc)
+    with process_lock:
+        info = running_apps.get(app_folder)
+        if info and info["process"] is proc:
+            release_app(app_folder)
+            app_restarts.pop(app_folder, None)
+    print(f"[Supervisor] {app_folder} stopped")
+
+def wait_until_ready(app_folder, timeout):
+    # Readiness gate: the app counts as ready once its port accepts connections
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = running_apps.get(app_folder)
+        if not info or not is_process_alive(info["process"]) or info["state"] == "stopping":
+            return False
+        if info["state"] == "ready":
+            return True
+        try:
+            with socket.create_connection(("127.0.0.1", info["port"]), timeout=0.25):
+                pass
+        except OSError:
+            time.sleep(0.05)
+            continue
+        mark_ready(app_folder)
+        return True
+    return False
 
-        process = subprocess.Popen(
-            [venv_python, start_script],
-            cwd=app_path,
-            env=env
-        )
+def mark_ready(app_folder):
+    with process_lock:
+        info = running_apps.get(app_folder)
+        if info and info["state"] == "starting":
+            info["state"] = "ready"
+            info["ready_after"] = round(time.time() - info["started_at"], 3)
 
-        assigned_ports[process.pid] = port
-        running_apps[app_folder] = {
-            "process": process,
-            "pid": process.pid,
-            "port": port,
-            "status": "starting"
-        }
+@app.route("/api/supervisor/start", methods=["POST"])
+def start_app():
+    data = request.get_json()
+    app_source = data.get("source")
+    app_folder = data.get("folder")
 
-        threading.Thread(target=monitor_health, args=(app_folder, port), daemon=True).start()
+    if not (app_source and app_folder):
+        return jsonify({"error": "Missing required fields"}), 400
 
-    return jsonify({"message": f"{app_folder} started", "pid": process.pid, "port": port})
+    payload, status_code = spawn_app(app_source, app_folder)
+    return jsonify(payload), status_code
+
+def request_stop(app_folder, wait=False):
+    # Returns (payload, status_code) as soon as SIGTERM is sent; SIGKILL
+    # escalation happens in the background unless wait=True
+    cancel_restart(("app", app_folder))
+    with app_lock(app_folder):
+        with process_lock:
+            info = running_apps.get(app_folder)
+            if info is None:
+                return {"error": f"{app_folder} is not running"}, 404
+            proc = info["process"]
+            already_stopping = info["state"] == "stopping"
+            info["state"] = "stopping"
+
+        if not already_stopping:
+            health_checker.unregister(app_folder)
+            signal_stop(proc)
+            stopper = threading.Thread(target=finish_stop, args=(app_folder, proc), daemon=True)
+            stopper.start()
+
+    if wait:
+        proc.wait()
+        return {"message": f"{app_folder} stopped"}, 200
+    return {"message": f"{app_folder} stopping", "state": "stopping"}, 202
 
 @app.route("/api/supervisor/stop", methods=["POST"])
 def stop_app():
+    # Pass {"wait": true} to block until the app has exited
     data = request.get_json()
-    app_folder = data.get("folder")
-
-    with process_lock:
-        if app_folder not in running_apps:
-            return jsonify({"error": f"{app_folder} is not running"}), 404
-
-        process_info = running_apps[app_folder]
-        proc = process_info["process"]
-
-        try:
-            if os.name == "nt":
-                proc.terminate()
-            else:
-                os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
-            proc.wait(timeout=10)
-        except Exception:
-            proc.kill()
-
-        del assigned_ports[proc.pid]
-        del running_apps[app_folder]
-
-    return jsonify({"message": f"{app_folder} stopped"})
+    payload, status_code = request_stop(data.get("folder"), wait=bool(data.get("wait")))
+    return jsonify(payload), status_code
+
+# Reverse proxy (SUPERVISOR_PROXY=1): each launched app gets a stable front
+# port; idle apps are stopped after their idle timeout and cold started again
+# by the next connection
+PROXY_ENABLED = os.getenv("SUPERVISOR_PROXY", "0") == "1"
+proxied_apps = {}  # folder -> source
+
+def proxy_backend_port(app_folder):
+    info = running_apps.get(app_folder)
+    if info and info["state"] == "ready" and is_process_alive(info["process"]):
+        return info["port"]
+    return None
+
+def proxy_ensure_running(app_folder):
+    # Blocking; runs on the proxy's executor while the client connection waits.
+    # Returns (port or None, whether this call launched the app).
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        info = running_apps.get(app_folder)
+        if info and info["state"] == "stopping":
+            try:
+                info["process"].wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                return None, False
+            time.sleep(0.05)
+            continue
+        payload, status_code = spawn_app(proxied_apps[app_folder], app_folder)
+        if status_code != 200:
+            print(f"[Supervisor] Proxy could not start {app_folder}: {payload.get('error')}")
+            return None, False
+        # Only a fresh launch reports whether it used a warm interpreter
+        launched = "warm" in payload
+        if wait_until_ready(app_folder, max(0.0, deadline - time.monotonic())):
+            return running_apps[app_folder]["port"], launched
+        return None, launched
+    return None, False
+
+app_proxy = None
+proxy_ports = None
+if PROXY_ENABLED:
+    proxy_ports = PortAllocator(*parse_port_range(os.getenv("SUPERVISOR_PROXY_PORT_RANGE", "8000-9000")))
+    app_proxy = AppProxy(
+        proxy_ensure_running,
+        proxy_backend_port,
+        lambda app_folder: request_stop(app_folder),
+        idle_timeout=float(os.getenv("SUPERVISOR_IDLE_TIMEOUT", "900"))
+    )
+
+def expose_app(app_source, app_folder):
+    # Returns the front port the app is reachable on through the proxy
+    proxied_apps[app_folder] = app_source
+    front_port = app_proxy.front_port(app_folder)
+    if front_port is not None:
+        return front_port
+    port, reservation = proxy_ports.reserve()
+    reservation.close()
+    settings = read_app_config(resolve_app(app_source, app_folder)[0])
+    idle_timeout = float(settings["idle_timeout"]) if "idle_timeout" in settings else None
+    try:
+        return app_proxy.expose(app_folder, port, idle_timeout=idle_timeout)
+    except Exception:
+        proxy_ports.release(port)
+        raise
 
 @app.route("/api/supervisor/launch", methods=["POST"])
 def launch_app():
+    # Starts the app if needed and, unless {"wait": false}, only returns the
+    # URL once the app's port accepts connections (up to "timeout" seconds)
     data = request.get_json()
     app_source = data.get("source")
     app_folder = data.get("folder")
@@ -258,49 +756,133 @@ def launch_app():
     if not (app_source and app_folder):
         return jsonify({"success": False, "error": "Missing required fields"}), 400
 
-    with process_lock:
-        # If already running, return URL immediately
-        if app_folder in running_apps and is_process_alive(running_apps[app_folder]["process"]):
-            port = running_apps[app_folder]["port"]
-            return jsonify({
-                "success": True,
-                "message": f"{app_folder} already running",
-                "url": f"http://localhost:{port}"
-            })
-
-    # Call start_app() which may return either a Response or (Response, status_code)
-    result = start_app()
-
-    # Properly unpack result if it is a tuple
-    if isinstance(result, tuple):
-        response_obj, status_code = result
-    else:
-        response_obj = result
-        status_code = response_obj.status_code  # default status code from Response
-
-    # Check if start_app failed
+    payload, status_code = spawn_app(app_source, app_folder)
     if status_code != 200:
-        # Extract error message from JSON if possible
-        try:
-            error_json = response_obj.get_json()
-            error_msg = error_json.get("error", "Failed to start app")
-        except Exception:
-            error_msg = "Failed to start app"
+        return jsonify({"success": False, "error": payload.get("error", "Failed to start app")}), status_code
 
-        return jsonify({"success": False, "error": error_msg}), status_code
-
-    # Extract port from response JSON
-    start_data = response_obj.get_json()
-    port = start_data.get("port")
+    port = payload.get("port")
     if not port:
         return jsonify({"success": False, "error": "Port assignment missing"}), 500
 
+    if data.get("wait", True):
+        timeout = min(float(data.get("timeout", READY_TIMEOUT)), READY_TIMEOUT)
+        if not wait_until_ready(app_folder, timeout):
+            return jsonify({
+                "success": False,
+                "error": f"{app_folder} did not become ready within {timeout:g}s"
+            }), 504
+
+    if app_proxy is not None:
+        port = expose_app(app_source, app_folder)
+
     return jsonify({
         "success": True,
-        "message": f"{app_folder} launched",
+        "message": payload["message"].replace("started", "launched"),
         "url": f"http://localhost:{port}"
     })
 
+# Resource limits ([Supervisor] memory_mb, cpu_percent, max_open_files,
+# cpu_seconds, restart_on_limit in config.ini) and /proc sampling
+cgroups = Cgroups()
+resource_sampler = ResourceSampler(history=int(os.getenv("SUPERVISOR_METRICS_HISTORY", "120")))
+LIMIT_STRIKES = int(os.getenv("SUPERVISOR_LIMIT_STRIKES", "3"))
+
+def restart_app(app_source, app_folder, reason):
+    print(f"[Supervisor] Restarting {app_folder}: {reason}")
+    request_stop(app_folder, wait=True)
+    spawn_app(app_source, app_folder)
+
+def sample_resources():
+    with process_lock:
+        apps = [(name, info) for name, info in running_apps.items() if info["state"] != "stopping"]
+    for name, info in apps:
+        point = resource_sampler.sample(name, info["pid"])
+        reason = over_limit(point, info["limits"])
+        info["limit_strikes"] = info["limit_strikes"] + 1 if reason else 0
+        if reason and info["limits"]["restart_on_limit"] and info["limit_strikes"] >= LIMIT_STRIKES:
+            info["limit_strikes"] = 0
+            threading.Thread(target=restart_app, args=(info["source"], name, reason), daemon=True).start()
+
+scheduler.add_job(sample_resources, "interval", seconds=float(os.getenv("SUPERVISOR_METRICS_INTERVAL", "5")))
+
+@app.route("/api/supervisor/metrics", methods=["GET"])
+def get_metrics():
+    with process_lock:
+        names = list(running_apps)
+    return jsonify({name: resource_sampler.series(name) for name in names})
+
+@app.route("/api/supervisor/metrics/<app_folder>", methods=["GET"])
+def get_app_metrics(app_folder):
+    info = running_apps.get(app_folder)
+    if info is None:
+        return jsonify({"error": f"{app_folder} is not running"}), 404
+    return jsonify({
+        "limits": info["limits"],
+        "cgroup": cgroups.available,
+        "samples": resource_sampler.series(app_folder)
+    })
+
+@app.route("/api/supervisor/logs", methods=["GET"])
+def list_logs():
+    return jsonify(log_collector.names())
+
+@app.route("/api/supervisor/logs/<name>", methods=["GET"])
+def tail_logs(name):
+    # ?lines=N (0 = whole buffer), ?since=<seq> for incremental polling,
+    # ?stream=stdout|stderr
+    lines, last_seq = log_collector.tail(
+        name,
+        lines=request.args.get("lines", 100, type=int),
+        since=request.args.get("since", type=int),
+        stream=request.args.get("stream")
+    )
+    if lines is None:
+        return jsonify({"error": f"No logs for {name}"}), 404
+    return jsonify({"lines": lines, "last_seq": last_seq})
+
+@app.route("/api/supervisor/logs/<name>/stream", methods=["GET"])
+def stream_logs(name):
+    # Server-sent events: the last ?lines=N lines, then new lines as they arrive
+    stream = request.args.get("stream")
+    lines, last_seq = log_collector.tail(name, lines=request.args.get("lines", 100, type=int), stream=stream)
+    if lines is None:
+        return jsonify({"error": f"No logs for {name}"}), 404
+
+    def events(lines, cursor):
+        while True:
+            for line in lines:
+                yield f"id: {line['seq']}\ndata: {json.dumps(line)}\n\n"
+            if not log_collector.wait(name, cursor, timeout=15):
+                yield ": keep-alive\n\n"
+            lines, cursor = log_collector.tail(name, lines=0, since=cursor, stream=stream)
+
+    return Response(stream_with_context(events(lines, last_seq)), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/api/supervisor/warm_pool", methods=["GET", "POST"])
+def warm_pool_route():
+    if request.method == "GET":
+        return jsonify(warm_pool.status())
+    # POST {"source", "folder", "size"?, "preload"?} (re)configures an app's pool
+    data = request.get_json()
+    app_source = data.get("source")
+    app_folder = data.get("folder")
+    if not (app_source and app_folder):
+        return jsonify({"error": "Missing required fields"}), 400
+    size = configure_warm_pool(app_source, app_folder, data.get("size"), data.get("preload"))
+    return jsonify({"message": f"Warm pool for {app_folder} set to {size}", "pools": warm_pool.status()})
+
+def prewarm_apps():
+    if not os.path.isdir(APPS_DIR):
+        return
+    for app_source in os.listdir(APPS_DIR):
+        source_path = os.path.join(APPS_DIR, app_source)
+        if not os.path.isdir(source_path):
+            continue
+        for app_folder in os.listdir(source_path):
+            if os.path.isdir(os.path.join(source_path, app_folder)):
+                configure_warm_pool(app_source, app_folder)
+
 @app.route("/api/supervisor/status", methods=["GET"])
 def get_status():
     with process_lock:
@@ -308,13 +890,45 @@ def get_status():
             name: {
                 "pid": info["pid"],
                 "port": info["port"],
-                "status": info["status"]
+                "status": info["status"],
+                "state": info["state"],
+                "warm": info["warm"],
+                "limits": info["limits"],
+                "resources": resource_sampler.latest(name),
+                **app_restarts[name].to_dict()
             } for name, info in running_apps.items()
         }
+        # Apps that exited on their own and were not (yet) restarted
+        for name, tracker in app_restarts.items():
+            if name not in statuses and tracker.last_exit_code is not None:
+                state = "crash_loop" if tracker.crash_loop else "exited"
+                statuses[name] = {"pid": None, "port": None, "status": state, "state": state, "warm": False, **tracker.to_dict()}
+    if app_proxy is not None:
+        # Scaled-to-zero apps stay listed with their proxy stats
+        for name, stats in app_proxy.stats().items():
+            statuses.setdefault(name, {"pid": None, "port": None, "status": "stopped", "state": "stopped", "warm": False})
+            statuses[name]["proxy"] = stats
     return jsonify(statuses)
 
+def serve_supervisor():
+    # Always one process: it owns the child processes and running_apps, so
+    # it scales with threads rather than workers
+    port = int(os.getenv("SUPERVISOR_PORT", "5500"))
+    if PRODUCTION:
+        try:
+            from waitress import serve
+        except ImportError:
+            print("[Supervisor] waitress not installed, using Werkzeug's threaded server")
+        else:
+            serve(app, host="127.0.0.1", port=port, threads=int(os.getenv("SUPERVISOR_THREADS", "16")))
+            return
+    app.run(port=port, debug=False, use_reloader=False, threaded=True)
+
 if __name__ == "__main__":
     print("[Supervisor] Starting backend and frontend core services...")
-    for name in core_services.keys():
-        print("→", start_core_service(name))
-    app.run(port=5500, debug=False, use_reloader=False)
\ No newline at end of file
+    results, seconds = start_core_services()
+    for msg in results.values():
+        print("→", msg)
+    print(f"[Supervisor] Core services booted in {seconds}s")
+    prewarm_apps()
+    serve_supervisor()
\ No newline at end of file
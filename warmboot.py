@@ -0,0 +1,42 @@
+# Bootstrap for pre-warmed app interpreters (see warmpool.py).
+# Usage: <venv python> warmboot.py <start.py> [module ...]
+# Imports the given modules, then blocks until the supervisor writes one JSON
+# line {"env": {...}} to stdin, and runs start.py as __main__ in-process.
+import os
+import sys
+import json
+import runpy
+import importlib
+
+
+def main():
+    start_script = os.path.abspath(sys.argv[1])
+    app_path = os.path.dirname(start_script)
+    os.chdir(app_path)
+    sys.path.insert(0, app_path)
+
+    for module in sys.argv[2:]:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            print(f"[warmboot] Could not preload {module}: {e}", file=sys.stderr)
+
+    line = sys.stdin.readline()
+    if not line:
+        # Supervisor went away or evicted us before handing off
+        return
+
+    handoff = json.loads(line)
+    os.environ.update(handoff.get("env", {}))
+
+    # The app should not inherit the handoff pipe as its stdin
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+
+    sys.argv = [start_script]
+    runpy.run_path(start_script, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
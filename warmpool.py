@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import signal
+import threading
+import subprocess
+
+
+class WarmPool:
+    # Keeps up to `size` interpreters per app that have already started and
+    # imported the app's preload modules, parked in warmboot.py waiting for a
+    # handoff. take() hands one out (the caller then calls handoff()), and a
+    # replacement is started in the background. Pools that have not been used
+    # for idle_timeout seconds are shut down until the app is launched again.
+    # With capture=True the interpreters' stdout/stderr are pipes; on_spawn(key,
+    # proc) is called for every new interpreter so the caller can drain them
+    # while it is parked, and then owns them.
+    def __init__(self, bootstrap, idle_timeout=600.0, capture=False, on_spawn=None):
+        self.bootstrap = bootstrap
+        self.idle_timeout = idle_timeout
+        self.capture = capture
+        self.on_spawn = on_spawn
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    def configure(self, key, python, start_script, size, preload=()):
+        with self._lock:
+            pool = self._pools.setdefault(key, {"procs": [], "last_used": time.monotonic()})
+            pool.update(python=python, start_script=start_script, size=size, preload=list(preload))
+        self.refill(key)
+
+    def _spawn(self, pool):
+        return subprocess.Popen(
+            [pool["python"], self.bootstrap, pool["start_script"], *pool["preload"]],
+            cwd=os.path.dirname(pool["start_script"]),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE if self.capture else None,
+            stderr=subprocess.PIPE if self.capture else None,
+            env=dict(os.environ, PYTHONUNBUFFERED="1") if self.capture else None,
+            start_new_session=(os.name != "nt"),
+            creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0
+        )
+
+    def refill(self, key):
+        spawned = []
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                return
+            pool["procs"] = [p for p in pool["procs"] if p.poll() is None]
+            missing = pool["size"] - len(pool["procs"])
+            for _ in range(max(0, missing)):
+                try:
+                    spawned.append(self._spawn(pool))
+                except OSError as e:
+                    print(f"[Supervisor] Could not pre-warm {key}: {e}")
+                    break
+            pool["procs"].extend(spawned)
+        if self.on_spawn is not None:
+            for proc in spawned:
+                self.on_spawn(key, proc)
+
+    def take(self, key):
+        # Returns a parked process or None (pool empty or not configured)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                return None
+            pool["last_used"] = time.monotonic()
+            proc = None
+            while pool["procs"]:
+                candidate = pool["procs"].pop(0)
+                if candidate.poll() is None:
+                    proc = candidate
+                    break
+        threading.Thread(target=self.refill, args=(key,), daemon=True).start()
+        return proc
+
+    def handoff(self, proc, env):
+        # Starts the app inside a parked interpreter; returns False if it died
+        try:
+            proc.stdin.write((json.dumps({"env": env}) + "\n").encode("utf-8"))
+            proc.stdin.close()
+            return True
+        except (BrokenPipeError, OSError, ValueError):
+            self._close_output(proc)
+            return False
+
+    def _close_output(self, proc):
+        if self.on_spawn is not None:
+            return  # the pipes belong to on_spawn's reader
+        for pipe in (proc.stdout, proc.stderr):
+            if pipe is not None:
+                pipe.close()
+
+    def evict_idle(self):
+        now = time.monotonic()
+        with self._lock:
+            idle = []
+            for key, pool in self._pools.items():
+                if pool["procs"] and now - pool["last_used"] >= self.idle_timeout:
+                    idle.extend(pool["procs"])
+                    pool["procs"] = []
+        for proc in idle:
+            self._terminate(proc)
+
+    def _terminate(self, proc):
+        # Closing stdin makes warmboot exit on its own; signal as a fallback
+        self._close_output(proc)
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=2)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            try:
+                if os.name == "nt":
+                    proc.terminate()
+                else:
+                    os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
+            except OSError:
+                pass
+
+    def status(self):
+        with self._lock:
+            return {
+                key: {
+                    "size": pool["size"],
+                    "warm": sum(1 for p in pool["procs"] if p.poll() is None),
+                    "preload": pool["preload"],
+                    "idle_seconds": round(time.monotonic() - pool["last_used"], 1)
+                } for key, pool in self._pools.items()
+            }
+
+    def shutdown(self):
+        with self._lock:
+            procs = [p for pool in self._pools.values() for p in pool["procs"]]
+            for pool in self._pools.values():
+                pool["procs"] = []
+        for proc in procs:
+            self._terminate(proc)